@@ -0,0 +1,35 @@
+import sys
+
+from lib.DungeonExporter import iter_dungeon_lua
+from lib.DungeonFloor import DungeonFloor
+from packageMod import DungeonInfo, package_virtual_dat_file
+
+# Assets every generated mod needs besides the dungeon script itself
+DEFAULT_INIT_LUA = """-- import standard assets
+import "assets/scripts/standard_assets.lua"
+"""
+
+
+def generate_mod_package(floors, dungeon_info: DungeonInfo, static_files: dict = None) -> bytes:
+    """Export generated floors to Lua and package them, along with any static assets, into a .dat file in memory.
+
+    `floors` may be any iterable, including a generator. The Lua script is streamed into the packager in chunks and
+    compressed as it is produced, so it is never held in memory in full.
+    `static_files` maps paths relative to the mod root to their contents, and may override the default `init.lua`.
+    """
+    virtual_files = {f"{dungeon_info.dungeon_folder}/init.lua": DEFAULT_INIT_LUA}
+    virtual_files.update(static_files or {})
+    virtual_files[f"{dungeon_info.dungeon_folder}/dungeon.lua"] = iter_dungeon_lua(floors)
+
+    return package_virtual_dat_file(dungeon_info, virtual_files)
+
+
+if __name__ == '__main__':
+    floor_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    info = DungeonInfo("Generated Dungeon", "GrimrockDungeonGenerator", "A randomly generated dungeon.",
+                       "mod_assets/scripts")
+    data = generate_mod_package((DungeonFloor(i) for i in range(1, floor_count + 1)), info)
+
+    f = open("out/generated.dat", "wb")
+    f.write(data)
+    f.close()
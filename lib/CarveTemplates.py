@@ -0,0 +1,51 @@
+from functools import lru_cache
+
+# Carve templates are masks of tiles to remove from a rectangular room, stored as frozensets of (x, y) offsets from
+# the room's top left corner. Each template is cached by the room dimensions and parameters it was built for.
+
+
+@lru_cache(maxsize=None)
+def l_shape_mask(width: int, height: int, square_dimension: int, remainder: int, reverse: bool):
+    """Square block removed from one corner of a room, plus a partial column or row along the room's long side"""
+    horizontal = width > height
+    mask = set()
+    for i in range(square_dimension):
+        for j in range(square_dimension):
+            mask.add((i, j))
+
+    for i in range(remainder):
+        mask.add((square_dimension, i) if horizontal else (i, square_dimension))
+
+    # Reversed shapes are carved from the bottom right corner instead of the top left
+    if reverse:
+        mask = {(width - 1 - x, height - 1 - y) for (x, y) in mask}
+
+    return frozenset(coords for coords in mask if 0 <= coords[0] < width and 0 <= coords[1] < height)
+
+
+@lru_cache(maxsize=None)
+def square_mask(edge: int):
+    return frozenset((x, y) for x in range(edge) for y in range(edge))
+
+
+@lru_cache(maxsize=None)
+def square_hole_positions(width: int, height: int, edge: int):
+    """Every offset at which a square hole can be cut from a room without splitting the room in two.
+
+    A hole spanning the full width of a room must sit against its top or bottom edge, and a hole spanning its full
+    height must sit against its left or right edge.
+    """
+    x_positions = range(0, width - edge + 1)
+    y_positions = range(0, height - edge + 1)
+    if edge >= width:
+        y_positions = sorted({0, height - edge})
+    if edge >= height:
+        x_positions = sorted({0, width - edge})
+
+    return tuple((x, y) for x in x_positions for y in y_positions)
+
+
+@lru_cache(maxsize=None)
+def interior_cells(width: int, height: int):
+    """Offsets of every tile in a room which is not on the room's outer edge"""
+    return tuple((x, y) for x in range(1, width - 1) for y in range(1, height - 1))
@@ -0,0 +1,239 @@
+from itertools import groupby
+
+from lib.DungeonFloor import DungeonFloor
+
+# Tile set declared in each map's header. loadLayer() references these by their one-based index
+FLOOR_TILE = "dungeon_floor"
+WALL_TILE = "dungeon_wall"
+MAP_TILES = (FLOOR_TILE, WALL_TILE)
+
+FLOOR_CHAR = str(MAP_TILES.index(FLOOR_TILE) + 1)
+WALL_CHAR = str(MAP_TILES.index(WALL_TILE) + 1)
+
+# Grimrock facings, and the (row, column) step on the floor grid which each facing points towards
+FACING_STEPS = ((0, (-1, 0)), (1, (0, 1)), (2, (1, 0)), (3, (0, -1)))
+
+# Splitting a string literal around a string.rep() call costs a concatenation operator and a pair of quotes
+RLE_SPLIT_COST = len(" .. ") + 2
+
+# Defined once at the top of dungeon.lua. In a tile layer passed to it, a number n repeats the previous row n times
+EXPAND_ROWS_LUA = """local function expandRows(rows)
+\tlocal layer = {}
+\tfor _, row in ipairs(rows) do
+\t\tif type(row) == "number" then
+\t\t\tfor _ = 1, row do
+\t\t\t\tlayer[#layer + 1] = layer[#layer]
+\t\t\tend
+\t\telse
+\t\t\tlayer[#layer + 1] = row
+\t\tend
+\tend
+\treturn layer
+end
+"""
+
+# Approximate number of characters collected before a chunk is handed to the consumer
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+def find_wall_facing(floor: DungeonFloor, row: int, col: int):
+    """Find the first facing from the given tile which points into a wall, or None if the tile is surrounded"""
+    for facing, (row_step, col_step) in FACING_STEPS:
+        adjacent_row = row + row_step
+        adjacent_col = col + col_step
+        if adjacent_row < 0 or adjacent_row > 31 or adjacent_col < 0 or adjacent_col > 31:
+            return facing
+
+        if floor.floor_grid[adjacent_row][adjacent_col] is None:
+            return facing
+
+    return None
+
+
+def is_floor(floor: DungeonFloor, row: int, col: int) -> bool:
+    return 0 <= row <= 31 and 0 <= col <= 31 and floor.floor_grid[row][col] is not None
+
+
+def find_stairs_position(upper: DungeonFloor, lower: DungeonFloor, excluded: tuple = None):
+    """Find a grid position for a linked pair of stairs, returned as (row, column, facing of the stairs down).
+
+    Linked stairs share a position on consecutive levels. The stairs down face `facing` on the upper level and the
+    stairs up face the opposite way on the lower level, so each is entered from the tile in front of it. Positions
+    where the tile behind each staircase is a wall are preferred. Returns None if the floors share no usable tile.
+    """
+    candidates = []
+    for row in range(len(upper.floor_grid)):
+        for col in range(len(upper.floor_grid[row])):
+            if (row, col) == excluded:
+                continue
+
+            # Only plain room tiles on both levels are used, never connectors or alcoves
+            upper_tile = upper.tiles[upper.floor_grid[row][col]] if upper.floor_grid[row][col] else None
+            lower_tile = lower.tiles[lower.floor_grid[row][col]] if lower.floor_grid[row][col] else None
+            if upper_tile is None or lower_tile is None or upper_tile.room_id is None or \
+                    lower_tile.room_id is None or upper_tile.is_alcove or lower_tile.is_alcove:
+                continue
+
+            for facing, (row_step, col_step) in FACING_STEPS:
+                # The stairs down are entered from behind their facing, and the stairs up from the opposite side
+                if not is_floor(upper, row - row_step, col - col_step) or \
+                        not is_floor(lower, row + row_step, col + col_step):
+                    continue
+
+                if not is_floor(upper, row + row_step, col + col_step) and \
+                        not is_floor(lower, row - row_step, col - col_step):
+                    return row, col, facing
+
+                candidates.append((row, col, facing))
+
+    return candidates[0] if candidates else None
+
+
+def encode_row(row: str):
+    """Encode a row of tile characters as a Lua string expression. Runs of one tile are written as string.rep() calls
+    only where that is shorter, so the result is never longer than the plain literal"""
+    parts = []
+    literal = ""
+    for char, run in groupby(row):
+        run_length = len(tuple(run))
+        repeated = f"(\"{char}\"):rep({run_length})"
+        if len(repeated) + RLE_SPLIT_COST >= run_length:
+            literal += char * run_length
+            continue
+
+        if literal:
+            parts.append(f"\"{literal}\"")
+            literal = ""
+        parts.append(repeated)
+
+    if literal or not parts:
+        parts.append(f"\"{literal}\"")
+
+    encoded = " .. ".join(parts)
+    return encoded if len(encoded) < len(row) + 2 else f"\"{row}\""
+
+
+def iter_floor_lua(floor: DungeonFloor, level: int, starting_location: bool = False, stairs_up: tuple = None,
+                   stairs_down: tuple = None):
+    """Yield the Grimrock 2 map script for a single floor, one line at a time.
+
+    `stairs_up` and `stairs_down` are positions returned by `find_stairs_position` for the links to the previous and
+    next levels.
+
+    The tile layer relies on the `expandRows` function which `iter_dungeon_lua` defines at the top of the script.
+    Rows of the floor grid become rows of the map, so the exported level reads the same way as the ASCII preview
+    printed by `generate.py`. In Grimrock coordinates, x is therefore the column and y is the row of the grid.
+    """
+    yield f"--- level {level} ---\n\n"
+    yield "newMap{\n"
+    yield f"\tname = \"Floor {floor.floor_number}\",\n"
+    yield f"\twidth = {len(floor.floor_grid[0])},\n"
+    yield f"\theight = {len(floor.floor_grid)},\n"
+    yield f"\tlevelCoord = {{0,0,{level - 1}}},\n"
+    yield "\tambientTrack = \"dungeon\",\n"
+    yield "\ttiles = {\n"
+    for tile_name in MAP_TILES:
+        yield f"\t\t\"{tile_name}\",\n"
+    yield "\t}\n"
+    yield "}\n\n"
+
+    # Walls and floors are written as a tile layer, one string per row of the grid. Identical consecutive rows are
+    # written once, followed by the number of times they repeat
+    yield "loadLayer(\"tiles\", expandRows{\n"
+    rows = ("".join(FLOOR_CHAR if col else WALL_CHAR for col in row) for row in floor.floor_grid)
+    for row, repeats in groupby(rows):
+        yield "\t" + encode_row(row) + ",\n"
+        repeat_count = len(tuple(repeats)) - 1
+        if repeat_count:
+            yield f"\t{repeat_count},\n"
+    yield "})\n\n"
+
+    # Objects placed on individual tiles
+    alcove_count = 0
+    for row_index, row in enumerate(floor.floor_grid):
+        for col_index, tile_id in enumerate(row):
+            if tile_id is None:
+                continue
+
+            tile = floor.tiles[tile_id]
+            if tile.is_alcove:
+                facing = find_wall_facing(floor, row_index, col_index)
+                if facing is not None:
+                    alcove_count += 1
+                    yield (f"spawn(\"dungeon_alcove\", {col_index},{row_index},{facing},0, "
+                           f"\"dungeon_alcove_{level}_{alcove_count}\")\n")
+
+    if stairs_up is not None:
+        row_index, col_index, facing = stairs_up
+        yield (f"spawn(\"dungeon_stairs_up\", {col_index},{row_index},{(facing + 2) % 4},0, "
+               f"\"dungeon_stairs_up_{level}\")\n")
+
+    if stairs_down is not None:
+        row_index, col_index, facing = stairs_down
+        yield (f"spawn(\"dungeon_stairs_down\", {col_index},{row_index},{facing},0, "
+               f"\"dungeon_stairs_down_{level}\")\n")
+
+    # The party starts on the first tile of the first room
+    if starting_location and floor.rooms:
+        start_row, start_col = starting_position(floor)
+        yield f"spawn(\"starting_location\", {start_col},{start_row},0,0, \"starting_location\")\n"
+
+    yield "\n"
+
+
+def starting_position(floor: DungeonFloor):
+    """The party starts on the first tile of the first room"""
+    start_row, start_col = next(iter(floor.rooms.values())).occupied_tiles[0]
+    return start_row, start_col
+
+
+def iter_linked_floors(floors):
+    """Yield (floor, stairs up, stairs down) for each floor, linking every floor to the next one with stairs.
+
+    Only the current floor and the next one are held at a time, so floors are still consumed lazily.
+    """
+    floors = iter(floors)
+    floor = next(floors, None)
+    stairs_up = None
+    excluded = starting_position(floor) if floor is not None and floor.rooms else None
+    while floor is not None:
+        next_floor = next(floors, None)
+        stairs_down = None
+        if next_floor is not None:
+            stairs_down = find_stairs_position(floor, next_floor, excluded)
+            if stairs_down is None:
+                raise Exception(f"Unable to place stairs between floors {floor.floor_number} and "
+                                f"{next_floor.floor_number}.")
+
+        yield floor, stairs_up, stairs_down
+
+        # The stairs up on the next floor must not be reused for its own stairs down
+        floor, stairs_up = next_floor, stairs_down
+        excluded = stairs_down[:2] if stairs_down is not None else None
+
+
+def iter_dungeon_lua(floors, buffer_size: int = DEFAULT_BUFFER_SIZE):
+    """Yield the `dungeon.lua` script for an iterable of floors, one level per floor, in buffered chunks.
+
+    Consecutive levels are linked with a pair of stairs. Floors are consumed lazily, so passing a generator keeps
+    memory use constant regardless of the floor count.
+    """
+    buffer = ["-- This file has been generated by GrimrockDungeonGenerator\n\n", EXPAND_ROWS_LUA, "\n"]
+    buffered = sum(len(part) for part in buffer)
+    for level, (floor, stairs_up, stairs_down) in enumerate(iter_linked_floors(floors), start=1):
+        for line in iter_floor_lua(floor, level, (level == 1), stairs_up, stairs_down):
+            buffer.append(line)
+            buffered += len(line)
+            if buffered >= buffer_size:
+                yield "".join(buffer)
+                buffer = []
+                buffered = 0
+
+    if buffer:
+        yield "".join(buffer)
+
+
+def export_dungeon_lua(floors, stream, buffer_size: int = DEFAULT_BUFFER_SIZE):
+    """Write the `dungeon.lua` script for an iterable of floors to a text stream"""
+    for chunk in iter_dungeon_lua(floors, buffer_size):
+        stream.write(chunk)
@@ -2,8 +2,11 @@ import logging
 import math
 import random
 
+from lib.CarveTemplates import interior_cells, l_shape_mask, square_hole_positions, square_mask
 from lib.DungeonRoom import DungeonRoom
 from lib.DungeonTile import DungeonTile
+from lib.FreeSpaceIndex import FreeSpaceIndex
+from lib.RoomFootprints import ALCOVE_HEIGHT, ALCOVE_WIDTH, get_footprint, shrink_variants, validation_rows
 
 
 class DungeonFloor:
@@ -11,6 +14,16 @@ class DungeonFloor:
     TOTAL_AREA = 32 * 32
     MIN_ROOMS = 10
     MAX_ROOMS = 18
+    AREA_BUDGET = .75  # Leave room for connectors, alcoves, secrets, etc
+    CARVE_MIN_TILES = 20
+    EXPANSIVE_CHANCE = 15
+    CARVE_MIN_PERCENT = 15
+    CARVE_MAX_PERCENT = 30
+    ADAPTIVE_PLACEMENT = False
+
+    # Increase whenever a change to generation alters the floor produced for a seed, so data which relies on
+    # regenerating floors from their seeds can detect floors it no longer describes
+    GENERATOR_VERSION = 1
 
     # Instance variables
     floor_number = None
@@ -18,15 +31,35 @@ class DungeonFloor:
     rooms = None
     tiles = None
 
+    # One bit per grid cell, set when the cell is occupied. Rows and columns are padded by one empty cell on each
+    # side, so bit y + 1 of row x + 1 describes floor_grid[x][y]
+    occupancy_rows = None
+
+    # Only used during adaptive room placement, see determine_adaptive_room_placement
+    adaptive_placement = None
+    free_space = None
+
+    # Generation statistics. Dropped rooms include unplaced rooms, which fit the area budget but found no space
+    rooms_requested = None
+    rooms_dropped = None
+    rooms_unplaced = None
+    carve_algorithms = None
+
     # Debugging data
     last_room_connection_args = None
     last_room_connection_paths = None
 
-    def __init__(self, floor_number: int):
+    def __init__(self, floor_number: int, adaptive_placement: bool = None):
         self.floor_number = floor_number
+        self.adaptive_placement = self.ADAPTIVE_PLACEMENT if adaptive_placement is None else adaptive_placement
+        self.free_space = FreeSpaceIndex() if self.adaptive_placement else None
         self.floor_grid = []
         self.rooms = {}
         self.tiles = {}
+        self.occupancy_rows = [0] * 34
+        self.rooms_dropped = 0
+        self.rooms_unplaced = 0
+        self.carve_algorithms = []
 
         # Generate the initial empty floor grid
         for x in range(0, 32):
@@ -36,9 +69,10 @@ class DungeonFloor:
 
         # Determine the number of desired rooms on this floor
         room_count = random.randint(self.MIN_ROOMS, self.MAX_ROOMS)
+        self.rooms_requested = room_count
 
         # Create rooms
-        remaining_area = self.TOTAL_AREA * .75  # Leave room for connectors, alcoves, secrets, etc
+        remaining_area = self.TOTAL_AREA * self.AREA_BUDGET
         for room in range(0, room_count):
             # Determine how large this room will be
             room_width = random.randint(2, 8)
@@ -48,32 +82,38 @@ class DungeonFloor:
 
             # If there is not enough area for more rooms, don't add any more rooms
             if room_area > remaining_area:
+                self.rooms_dropped += 1
                 continue
 
-            # Find available space on the floor and place the room
-            create_room_args = self.determine_room_placement(room_width, room_height, alcove_size)
+            # Find available space on the floor and place the room. In adaptive mode, the room may be shrunk to fit
+            if self.adaptive_placement:
+                create_room_args = self.determine_adaptive_room_placement(room_width, room_height, alcove_size)
+            else:
+                create_room_args = self.determine_room_placement(room_width, room_height, alcove_size)
 
             # Occasionally the generator may create a room layout which is highly inefficient in its use of space.
             # In these cases, we simply do skip placing this room
             if create_room_args is None:
                 logging.debug(f"Unable to place room with dimensions ({room_width}, {room_height}) " +
                               f"on floor {self.floor_number}.")
+                self.rooms_dropped += 1
+                self.rooms_unplaced += 1
                 continue
 
             # Save tiles, save room, reduce the remaining area
             new_room = self.create_room(*create_room_args)
             self.rooms[new_room.room_id] = new_room
-            remaining_area -= room_area
+            remaining_area -= len(new_room.occupied_tiles)
 
         # Rooms with twenty or more tiles should have some randomly removed
         for key in tuple(self.rooms.keys()):
             room = self.rooms[key]
             # Only rooms with 20 or more tiles are modified
-            if len(room.occupied_tiles) < 20:
+            if len(room.occupied_tiles) < self.CARVE_MIN_TILES:
                 continue
 
             # There is a fifteen percent chance to just have a massive empty room
-            if random.randint(0, 99) < 15:
+            if random.randint(0, 99) < self.EXPANSIVE_CHANCE:
                 room.set_expansive(True)
                 continue
 
@@ -95,33 +135,48 @@ class DungeonFloor:
             print(self.rooms[self.last_room_connection_args[1]].occupied_tiles[0])
             print(f"Room connection paths: {self.last_room_connection_paths}")
 
-            for row in self.floor_grid:
-                output = ""
-                for col in row:
-                    tile = self.tiles[col] if col else None
-                    output += ("O " if (tile and tile.is_connector) else ("X " if tile else "- "))
-
-                print(output)
+            # Imported here, as the renderer itself depends on this module
+            from lib.FloorRenderer import render_ascii
+            print(render_ascii(self))
             raise
 
-    def determine_room_placement(self, width: int, height: int, alcove_size: int):
-        # Effective width and height of the room. If an alcove is present, either may be increased to ensure
-        # enough room is reserved for the alcove to be placed
-        effective_width = width
-        effective_height = height
+    @classmethod
+    def from_seed(cls, seed, floor_number: int, adaptive_placement: bool = None):
+        """Generate the floor determined by a seed. The global random state is restored afterwards"""
+        state = random.getstate()
+        random.seed(f"{seed}:{floor_number}")
+        try:
+            return cls(floor_number, adaptive_placement)
+        finally:
+            random.setstate(state)
+
+    def place_tile(self, x: int, y: int, tile: DungeonTile):
+        """Put a tile on the floor grid and keep the tile list and occupancy rows in step"""
+        self.floor_grid[x][y] = tile.tile_id
+        self.tiles[tile.tile_id] = tile
+        self.occupancy_rows[x + 1] |= 1 << (y + 1)
+
+    def remove_tile(self, x: int, y: int):
+        """Remove the tile at a grid position from the grid, the tile list and its room, if it belongs to one"""
+        tile = self.tiles[self.floor_grid[x][y]]
+        if tile.room_id is not None:
+            self.rooms[tile.room_id].remove_tile((x, y))
+        del self.tiles[tile.tile_id]
+        self.floor_grid[x][y] = None
+        self.occupancy_rows[x + 1] &= ~(1 << (y + 1))
 
-        # If an alcove is present in this room, expand the effective size of the room. Start by determining
-        # whether the alcove will be vertical or horizontal
+    def determine_room_placement(self, width: int, height: int, alcove_size: int):
+        # If an alcove is present in this room, the effective size of the room is expanded to ensure enough room
+        # is reserved for the alcove to be placed. Start by determining whether the alcove will be vertical or
+        # horizontal
         alcove_placement = None  # None= no alcove, 1 = width expanded, 2 = height expanded
         if alcove_size > 0:
-            alcove_placement = 1 if (random.randint(0, 1)) else 2
-
-        # Perform the boundary expansion
-        if alcove_placement == 1:
-            effective_width += 1
+            alcove_placement = ALCOVE_WIDTH if (random.randint(0, 1)) else ALCOVE_HEIGHT
 
-        if alcove_placement == 2:
-            effective_height += 1
+        # Effective width and height of the room, including the alcove
+        footprint = get_footprint(width, height, alcove_placement)
+        effective_width = footprint.effective_width
+        effective_height = footprint.effective_height
 
         # Pick a random starting point on the grid where it might be possible to place this room.
         # If the room can be placed in that location, place it there. Attempt this random placement twenty-five times.
@@ -144,74 +199,64 @@ class DungeonFloor:
         # of area to be available, but not in such a way as it can be used.
         return None
 
+    def determine_adaptive_room_placement(self, width: int, height: int, alcove_size: int):
+        """Place a room using the free space index instead of random attempts and a full scan.
+
+        If the requested room does not fit anywhere, it is shrunk to the largest size which does, dropping the
+        alcove only when it is what prevents a size from fitting. Returns None only when not even the smallest
+        room fits on the floor.
+        """
+        alcove_placement = None
+        if alcove_size > 0:
+            alcove_placement = ALCOVE_WIDTH if (random.randint(0, 1)) else ALCOVE_HEIGHT
+
+        for room_width, room_height in shrink_variants(width, height):
+            for placement, size in ((alcove_placement, alcove_size), (None, 0)):
+                footprint = get_footprint(room_width, room_height, placement)
+                position = self.free_space.random_position(footprint.effective_width, footprint.effective_height)
+                if position is not None:
+                    return position[0], position[1], room_width, room_height, placement, size
+
+                if placement is None:
+                    break
+
+        return None
+
     def validate_room_placement(self, x_pos, y_pos, width, height):
-        # Determine the range of x and y coordinates which must pass validation
-        x_bounds = (x_pos, x_pos + (width - 1))
-        y_bounds = (y_pos, y_pos + (height - 1))
-
-        # Loop over each grid and determine if the space is a valid space for a new room to occupy
-        for x in range(x_bounds[0], x_bounds[1] + 1):
-            for y in range(y_bounds[0], y_bounds[1] + 1):
-                # If any desired space is occupied by another room, validation fails
-                if self.floor_grid[x][y] is not None:
-                    return False
-
-                # If this is a room border, all adjacent squares must also be unoccupied
-                if x == x_pos or y == y_pos or x == x_bounds[1] or y == y_bounds[1]:
-                    # Check left
-                    if x > 0 and self.floor_grid[x - 1][y] is not None:
-                        return False
-
-                    # Check right
-                    if x < 31 and self.floor_grid[x + 1][y] is not None:
-                        return False
-
-                    # Check top
-                    if y > 0 and self.floor_grid[x][y - 1] is not None:
-                        return False
-
-                    # Check bottom
-                    if y < 31 and self.floor_grid[x][y + 1] is not None:
-                        return False
+        # Every desired space, and every space adjacent to the room's border, must be unoccupied. Each row of the
+        # validation mask is compared against the matching row of occupancy bits in a single operation
+        for i, row_mask in enumerate(validation_rows(width, height)):
+            if self.occupancy_rows[x_pos + i] & (row_mask << y_pos):
+                return False
 
         return True
 
     def create_room(self, x_pos: int, y_pos: int, width: int, height: int, alcove_placement: int, alcove_size: int):
         logging.debug(f"Placing room with size ({height}, {width}) at [{y_pos}, {x_pos}] with alcove size" +
                       " {alcove_size}, placement {alcove_placement}.")
-        occupied_tiles = []
+        footprint = get_footprint(width, height, alcove_placement)
+        occupied_tiles = [[x_pos + x, y_pos + y] for (x, y) in footprint.room_offsets]
         alcove_tiles = []
-        for x in range(x_pos, x_pos + width):
-            for y in range(y_pos, y_pos + height):
-                occupied_tiles.append([x, y])
 
         # TODO: Allow alcoves to be placed on left and top of rooms
 
-        # Place the alcove in the expanded width
-        if alcove_placement == 1:
-            alcove_x = x_pos + width
-            alcove_y = random.randint(y_pos, y_pos + height - alcove_size)
-            for i in range(alcove_y, alcove_y + alcove_size):
-                alcove_tiles.append([alcove_x, i])
-
-        # Place the alcove in the expanded height
-        if alcove_placement == 2:
-            alcove_x = random.randint(x_pos, x_pos + width - alcove_size)
-            alcove_y = y_pos + height
-            for i in range(alcove_x, alcove_x + alcove_size):
-                alcove_tiles.append([i, alcove_y])
+        # Place the alcove in the expanded width or height
+        if alcove_placement is not None:
+            alcove_tiles = [[x_pos + x, y_pos + y] for (x, y) in
+                            random.choice(footprint.alcove_candidates[alcove_size])]
 
         new_room = DungeonRoom(self.floor_number, occupied_tiles + alcove_tiles)
 
         for tile in occupied_tiles:
-            new_tile = DungeonTile(room_id=new_room.room_id, is_alcove=False)
-            self.floor_grid[tile[0]][tile[1]] = new_tile.tile_id
-            self.tiles[new_tile.tile_id] = new_tile
+            self.place_tile(tile[0], tile[1], DungeonTile(room_id=new_room.room_id, is_alcove=False))
 
         for tile in alcove_tiles:
-            new_tile = DungeonTile(room_id=new_room.room_id, is_alcove=True)
-            self.floor_grid[tile[0]][tile[1]] = new_tile.tile_id
-            self.tiles[new_tile.tile_id] = new_tile
+            self.place_tile(tile[0], tile[1], DungeonTile(room_id=new_room.room_id, is_alcove=True))
+
+        # Space around the new room can no longer hold other rooms
+        if self.free_space is not None:
+            for tile in new_room.occupied_tiles:
+                self.free_space.occupy(tile[0], tile[1])
 
         return new_room
 
@@ -285,9 +330,7 @@ class DungeonFloor:
 
             else:
                 # This coordinate is not a tile, but is on the way to the destination. Place a tile here
-                new_tile = DungeonTile(room_id=None, is_connector=True)
-                self.floor_grid[current_x][start_coord[1]] = new_tile.tile_id
-                self.tiles[new_tile.tile_id] = new_tile
+                self.place_tile(current_x, start_coord[1], DungeonTile(room_id=None, is_connector=True))
 
             # Analyze the adjacent Y-coords to determine if either of those are rooms
             for y_coord in (start_coord[1] - 1, start_coord[1] + 1):
@@ -357,9 +400,7 @@ class DungeonFloor:
 
             else:
                 # This coordinate is not a tile, but is on the way to the destination. Place a tile here
-                new_tile = DungeonTile(room_id=None, is_connector=True)
-                self.floor_grid[end_coord[0]][current_y] = new_tile.tile_id
-                self.tiles[new_tile.tile_id] = new_tile
+                self.place_tile(end_coord[0], current_y, DungeonTile(room_id=None, is_connector=True))
 
             # Analyze the adjacent X-coords to determine if either of those are rooms
             for x_coord in (end_coord[0] - 1, end_coord[0] + 1):
@@ -398,29 +439,35 @@ class DungeonFloor:
                         # to cris-cross with each other, so no action is necessary
                         pass
 
+    def remove_room_tiles(self, room: DungeonRoom, tile_coords):
+        """Remove a set of tiles from a room, the tile list and the floor grid in one pass"""
+        tile_coords = {(x, y) for (x, y) in tile_coords if
+                       self.floor_grid[x][y] is not None and self.tiles[self.floor_grid[x][y]].room_id == room.room_id}
+        room.remove_tiles(tile_coords)
+        for (x, y) in tile_coords:
+            del self.tiles[self.floor_grid[x][y]]
+            self.floor_grid[x][y] = None
+            self.occupancy_rows[x + 1] &= ~(1 << (y + 1))
+        return len(tile_coords)
+
     def carve_room(self, room_id):
         room = self.rooms[room_id]
 
         # Remove between fifteen and thirty percent of tiles in the room
-        tiles_to_remove = math.ceil(len(room.occupied_tiles) * (random.randint(15, 30) / 100))
+        tiles_to_remove = math.ceil(len(room.occupied_tiles) *
+                                    (random.randint(self.CARVE_MIN_PERCENT, self.CARVE_MAX_PERCENT) / 100))
 
         # Find alcove tiles in this room and remove them first, thus converting the room into a rectangle
-        occupied_tiles = room.occupied_tiles.copy()
-        for tile_coords in occupied_tiles:
-            tile = self.tiles[self.floor_grid[tile_coords[0]][tile_coords[1]]]
-            if tile.is_alcove:
-                self.floor_grid[tile_coords[0]][tile_coords[1]] = None
-                room.remove_tile(tile_coords)
-                del self.tiles[tile.tile_id]
-                tiles_to_remove -= 1
+        tiles_to_remove -= self.remove_room_tiles(room, [
+            tile_coords for tile_coords in room.occupied_tiles
+            if self.tiles[self.floor_grid[tile_coords[0]][tile_coords[1]]].is_alcove
+        ])
 
         # Analyze the room to determine corner coordinates
-        min_x = max_x = min_y = max_y = None
-        for tile_coords in room.occupied_tiles:
-            min_x = tile_coords[0] if (min_x is None or min_x > tile_coords[0]) else min_x
-            max_x = tile_coords[0] if (max_x is None or max_x < tile_coords[0]) else max_x
-            min_y = tile_coords[1] if (min_y is None or min_y > tile_coords[1]) else min_y
-            max_y = tile_coords[1] if (max_y is None or max_y < tile_coords[1]) else max_y
+        min_x = min(tile_coords[0] for tile_coords in room.occupied_tiles)
+        min_y = min(tile_coords[1] for tile_coords in room.occupied_tiles)
+        width = max(tile_coords[0] for tile_coords in room.occupied_tiles) - min_x + 1
+        height = max(tile_coords[1] for tile_coords in room.occupied_tiles) - min_y + 1
 
         algorithm_choice = random.randint(0, 98)
 
@@ -429,111 +476,36 @@ class DungeonFloor:
         # Addendum:
         # Sufficiently small rooms aren't viable for more destructive algorithms, so we only use the L-Shape algorithm
         if (len(room.occupied_tiles) < 31) or (algorithm_choice < 33):
+            algorithm = "l_shape"
             square_dimension = math.floor(math.sqrt(tiles_to_remove))
             remainder = math.ceil(math.sqrt(tiles_to_remove) % square_dimension)
             reverse = True if (random.randint(0, 1) == 1) else False
-
-            # Determine starting coordinates
-            x_coord = max_x if reverse else min_x
-            y_coord = max_y if reverse else min_y
-            increment = -1 if reverse else 1
-
-            # Traverse horizontally if the room is wider than tall
-            if (max_x - min_x) > (max_y - min_y):
-                # Remove tiles from each coordinate
-                target_x = (x_coord + (square_dimension * increment))
-                while x_coord != target_x:
-                    target_y = (y_coord + (square_dimension * increment))
-                    while y_coord != target_y:
-                        room.remove_tile((x_coord, y_coord))
-                        del self.tiles[self.floor_grid[x_coord][y_coord]]
-                        self.floor_grid[x_coord][y_coord] = None
-                        y_coord += increment
-                    y_coord = max_y if reverse else min_y
-                    x_coord += increment
-
-                # Remove any remaining tiles from the next column, which will always be fewer than
-                # the square_dimension
-                if remainder > 0:
-                    target_y = (y_coord + (remainder * increment))
-                    while y_coord != target_y:
-                        room.remove_tile((x_coord, y_coord))
-                        del self.tiles[self.floor_grid[x_coord][y_coord]]
-                        self.floor_grid[x_coord][y_coord] = None
-                        y_coord += increment
-
-            # Traverse vertically if the room is taller than wide
-            else:
-                # Remove tiles from each coordinate
-                target_y = (y_coord + (square_dimension * increment))
-                while y_coord != target_y:
-                    target_x = (x_coord + (square_dimension * increment))
-                    while x_coord != target_x:
-                        room.remove_tile((x_coord, y_coord))
-                        del self.tiles[self.floor_grid[x_coord][y_coord]]
-                        self.floor_grid[x_coord][y_coord] = None
-                        x_coord += increment
-                    x_coord = max_x if reverse else min_x
-                    y_coord += increment
-
-                # Remove and remaining tiles from the next row, which will always be fewer than
-                # the square dimension
-                if remainder > 0:
-                    target_x = (x_coord + (remainder * increment))
-                    while x_coord != target_x:
-                        room.remove_tile((x_coord, y_coord))
-                        del self.tiles[self.floor_grid[x_coord][y_coord]]
-                        self.floor_grid[x_coord][y_coord] = None
-                        x_coord += increment
-
-            return
+            mask = l_shape_mask(width, height, square_dimension, remainder, reverse)
 
         # Minimum room size = 31
         # Remove a 3x3 or 4x4 square from the room, based on total room size
         # Ignores the target number of tiles to remove
         elif algorithm_choice < 66:
+            algorithm = "square"
             square_edge = 3 if (len(room.occupied_tiles) < 16) else 4
-            start_x = min_x
-            start_y = min_y
-
-            if min_x == (max_x - square_edge):
-                start_x = random.randint(min_x, max_x - square_edge)
-
-            if min_y == (max_y - square_edge):
-                random.randint(min_y, max_y - square_edge)
-
-            for x in range(start_x, start_x + square_edge):
-                for y in range(start_y, start_y + square_edge):
-                    room.remove_tile((x, y))
-                    del self.tiles[self.floor_grid[x][y]]
-                    self.floor_grid[x][y] = None
-            return
+            offset_x, offset_y = random.choice(square_hole_positions(width, height, square_edge))
+            mask = [(x + offset_x, y + offset_y) for (x, y) in square_mask(square_edge)]
 
         # Minimum room size = 31
-        # Random tile removal algorithm
+        # Random tile removal algorithm. Edges of the room are never removed in this manner
         else:
-            while tiles_to_remove > 0:
-                # Remove random tiles from the room
-                x, y = room.occupied_tiles[random.randint(0, len(room.occupied_tiles) - 1)]
-
-                # Do not remove the edges of a room in this manner
-                if x == max_x or x == min_x or y == max_y or y == min_y:
-                    continue
-
-                # Remove this tile
-                room.remove_tile((x, y))
-                del self.tiles[self.floor_grid[x][y]]
-                self.floor_grid[x][y] = None
-                tiles_to_remove -= 1
-
-            # Find any inaccessible tiles and remove them
-            for (x, y) in room.occupied_tiles:
-                if \
-                        ((x+1 < 33) and (self.floor_grid[x+1][y] is None)) and \
-                        ((x-1 > 0) and (self.floor_grid[x-1][y] is None)) and \
-                        ((y+1 < 33) and (self.floor_grid[x][y+1] is None)) and \
-                        ((y-1 > 0) and (self.floor_grid[x][y-1] is None)):
-                    room.remove_tile((x, y))
-                    del self.tiles[self.floor_grid[x][y]]
-                    self.floor_grid[x][y] = None
-            return
+            algorithm = "random"
+            interior = interior_cells(width, height)
+            mask = random.sample(interior, min(max(tiles_to_remove, 0), len(interior)))
+
+        self.carve_algorithms.append(algorithm)
+        self.remove_room_tiles(room, [(min_x + x, min_y + y) for (x, y) in mask])
+
+        # Random removal may leave tiles with no neighbours, which would be inaccessible. Remove them as well
+        if algorithm == "random":
+            self.remove_room_tiles(room, [
+                (x, y) for (x, y) in room.occupied_tiles
+                if all(not (0 <= adjacent_x < 32 and 0 <= adjacent_y < 32) or
+                       self.floor_grid[adjacent_x][adjacent_y] is None
+                       for (adjacent_x, adjacent_y) in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)))
+            ])
@@ -26,3 +26,7 @@ class DungeonRoom:
             if self.occupied_tiles[i][0] == tile_coords[0] and self.occupied_tiles[i][1] == tile_coords[1]:
                 del self.occupied_tiles[i]
                 return
+
+    """Delete several tiles from the list of occupied tiles in a single pass"""
+    def remove_tiles(self, tile_coords: set):
+        self.occupied_tiles = [coords for coords in self.occupied_tiles if (coords[0], coords[1]) not in tile_coords]
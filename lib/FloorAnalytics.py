@@ -0,0 +1,154 @@
+import sys
+from array import array
+from collections import Counter, deque
+from multiprocessing import Pool
+
+from lib.DungeonFloor import DungeonFloor
+
+# Integer metrics collected for every floor. Every metric fits within the area of a floor
+METRICS = ("room_count", "rooms_dropped", "filled_area", "corridor_tiles", "expansive_rooms", "path_length_estimate")
+HISTOGRAM_SIZE = DungeonFloor.TOTAL_AREA + 1
+
+
+def estimate_longest_path(floor: DungeonFloor) -> int:
+    """Estimate the longest shortest path between two walkable tiles using a double breadth-first sweep.
+
+    The sweep finds the exact diameter on tree-like layouts but is only a lower bound otherwise, so it is reported as
+    an estimate. It costs two searches instead of one per tile.
+    """
+    start = next((
+        (x, y) for x, row in enumerate(floor.floor_grid) for y, tile_id in enumerate(row) if tile_id is not None
+    ), None)
+    if start is None:
+        return 0
+
+    farthest, _ = _breadth_first_farthest(floor.floor_grid, start)
+    _, distance = _breadth_first_farthest(floor.floor_grid, farthest)
+    return distance
+
+
+def _breadth_first_farthest(floor_grid: list, start: tuple):
+    distances = {start: 0}
+    queue = deque((start,))
+    farthest = start
+    while queue:
+        x, y = queue.popleft()
+        distance = distances[(x, y)]
+        if distance > distances[farthest]:
+            farthest = (x, y)
+
+        for next_x, next_y in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if 0 <= next_x < 32 and 0 <= next_y < 32 and floor_grid[next_x][next_y] is not None and \
+                    (next_x, next_y) not in distances:
+                distances[(next_x, next_y)] = distance + 1
+                queue.append((next_x, next_y))
+
+    return farthest, distances[farthest]
+
+
+def floor_metrics(floor: DungeonFloor) -> dict:
+    """Measure a single generated floor"""
+    corridor_tiles = sum(1 for tile in floor.tiles.values() if tile.is_connector)
+    return {
+        "room_count": len(floor.rooms),
+        "rooms_dropped": floor.rooms_dropped,
+        "filled_area": len(floor.tiles),
+        "corridor_tiles": corridor_tiles,
+        "expansive_rooms": sum(1 for room in floor.rooms.values() if room.is_expansive),
+        "path_length_estimate": estimate_longest_path(floor),
+        "carve_algorithms": floor.carve_algorithms,
+    }
+
+
+class FloorStatistics:
+    """Fixed-size accumulators for floor metrics. Memory use does not grow with the number of floors measured"""
+    floor_count = None
+    histograms = None
+    carve_algorithms = None
+
+    def __init__(self):
+        self.floor_count = 0
+        self.histograms = {metric: array("q", bytes(8 * HISTOGRAM_SIZE)) for metric in METRICS}
+        self.carve_algorithms = Counter()
+
+    def add(self, metrics: dict):
+        self.floor_count += 1
+        for metric in METRICS:
+            self.histograms[metric][min(metrics[metric], HISTOGRAM_SIZE - 1)] += 1
+        self.carve_algorithms.update(metrics["carve_algorithms"])
+
+    def merge(self, other):
+        self.floor_count += other.floor_count
+        for metric in METRICS:
+            self.histograms[metric] = array("q", map(sum, zip(self.histograms[metric], other.histograms[metric])))
+        self.carve_algorithms.update(other.carve_algorithms)
+
+    def mean(self, metric: str) -> float:
+        if not self.floor_count:
+            return 0.0
+        return sum(value * count for value, count in enumerate(self.histograms[metric])) / self.floor_count
+
+    def quantile(self, metric: str, fraction: float) -> int:
+        """Smallest value for which at least `fraction` of the floors measured have a metric less than or equal"""
+        target = fraction * self.floor_count
+        seen = 0
+        for value, count in enumerate(self.histograms[metric]):
+            seen += count
+            if count and seen >= target:
+                return value
+        return 0
+
+    def summary(self) -> dict:
+        return {
+            "floor_count": self.floor_count,
+            "metrics": {metric: {
+                "mean": self.mean(metric),
+                "min": self.quantile(metric, 0),
+                "p50": self.quantile(metric, .5),
+                "p90": self.quantile(metric, .9),
+                "p99": self.quantile(metric, .99),
+                "max": self.quantile(metric, 1),
+            } for metric in METRICS},
+            "carve_algorithms": dict(self.carve_algorithms),
+        }
+
+
+def _apply_settings(settings: dict):
+    """Override DungeonFloor tuning constants such as MIN_ROOMS or AREA_BUDGET within a worker process"""
+    for name, value in (settings or {}).items():
+        setattr(DungeonFloor, name, value)
+
+
+def _measure_seed_range(seed_range: tuple) -> FloorStatistics:
+    start, stop, floor_number = seed_range
+    statistics = FloorStatistics()
+    for seed in range(start, stop):
+        statistics.add(floor_metrics(DungeonFloor.from_seed(seed, floor_number)))
+    return statistics
+
+
+def analyze_seeds(start: int, stop: int, floor_number: int = 1, settings: dict = None, processes: int = None,
+                  chunk_size: int = 500) -> FloorStatistics:
+    """Generate and measure the floors for every seed in [start, stop) across a pool of worker processes.
+
+    Each worker aggregates a whole chunk of seeds before returning it, so only fixed-size accumulators are sent
+    between processes. `settings` overrides DungeonFloor class constants for the duration of the run.
+    """
+    chunks = ((chunk_start, min(chunk_start + chunk_size, stop), floor_number)
+              for chunk_start in range(start, stop, chunk_size))
+
+    statistics = FloorStatistics()
+    with Pool(processes, initializer=_apply_settings, initargs=(settings,)) as pool:
+        for chunk_statistics in pool.imap_unordered(_measure_seed_range, chunks):
+            statistics.merge(chunk_statistics)
+
+    return statistics
+
+
+if __name__ == '__main__':
+    summary = analyze_seeds(int(sys.argv[1]), int(sys.argv[2])).summary()
+    print(f"Floors analyzed: {summary['floor_count']}")
+    for name, values in summary["metrics"].items():
+        print(f"{name}: " + ", ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                                       for key, value in values.items()))
+    print(f"Carve algorithms: {summary['carve_algorithms']}")
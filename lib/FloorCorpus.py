@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import queue
+import struct
+import sys
+from multiprocessing import Process, Queue
+
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorSerializer import serialize_floor
+
+# Each record is the seed and the length of the serialized floor, followed by the serialized floor itself
+SHARD_HEADER = b"GDGS"
+RECORD_HEADER_FORMAT = "<qI"
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER_FORMAT)
+
+# The index of a shard holds the offset of every record, as unsigned 64-bit integers
+INDEX_FORMAT = "<Q"
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_FORMAT)
+
+MANIFEST_NAME = "manifest.json"
+
+# How often the writer checks that its workers are still running while it waits for a batch
+RESULT_POLL_SECONDS = 1
+
+
+def _corpus_worker(tasks: Queue, results: Queue, floor_generator, floor_number: int, adaptive_placement: bool):
+    """Generate batches of floors until a None task is received. A failed batch is sent back as its exception"""
+    for task in iter(tasks.get, None):
+        batch_start, batch_stop = task
+        try:
+            records = [(seed, serialize_floor(floor_generator(seed, floor_number, adaptive_placement)))
+                       for seed in range(batch_start, batch_stop)]
+        except Exception as error:
+            results.put((batch_start, error))
+            return
+        results.put((batch_start, records))
+
+
+class CorpusWriter:
+    """Writes a library of pre-generated floors into size-capped, checksummed shard files.
+
+    Floors are generated by worker processes and handed to the writer through bounded queues, so no more than
+    `max_in_flight` batches exist at any time. Shards are written in seed order, and a shard is only added to the
+    manifest once it and its index are complete. An interrupted build therefore resumes from the first seed after
+    the last completed shard.
+
+    `floor_generator` is called as `floor_generator(seed, floor_number, adaptive_placement)` within the workers, and
+    defaults to `DungeonFloor.from_seed`. It is sent to the workers, so it must be picklable, such as a module-level
+    function.
+    """
+    directory = None
+    floor_number = None
+    adaptive_placement = None
+    shard_bytes = None
+    batch_size = None
+    workers = None
+    max_in_flight = None
+    floor_generator = None
+    manifest = None
+
+    def __init__(self, directory: str, floor_number: int = 1, adaptive_placement: bool = False,
+                 shard_bytes: int = 64 * 1024 * 1024, batch_size: int = 100, workers: int = None,
+                 max_in_flight: int = None, floor_generator=None):
+        self.directory = directory
+        self.floor_number = floor_number
+        self.adaptive_placement = adaptive_placement
+        self.shard_bytes = shard_bytes
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self.floor_generator = floor_generator or DungeonFloor.from_seed
+
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = read_manifest(directory) or {
+            "generator_version": DungeonFloor.GENERATOR_VERSION,
+            "floor_number": floor_number,
+            "adaptive_placement": adaptive_placement,
+            "shards": [],
+        }
+
+        # Floors from another generator version no longer match their seeds, so they must not be extended
+        if self.manifest.get("generator_version") != DungeonFloor.GENERATOR_VERSION:
+            raise Exception(f"Corpus in {directory} was generated with generator version "
+                            f"{self.manifest.get('generator_version')}, but the current version is "
+                            f"{DungeonFloor.GENERATOR_VERSION}.")
+
+        if (self.manifest["floor_number"], self.manifest["adaptive_placement"]) != (floor_number, adaptive_placement):
+            raise Exception(f"Corpus in {directory} was generated with different settings.")
+
+    def build(self, start_seed: int, stop_seed: int):
+        """Generate and store the floor for every seed in [start_seed, stop_seed)"""
+        if self.manifest["shards"]:
+            start_seed = max(start_seed, self.manifest["shards"][-1]["stop_seed"])
+        if start_seed >= stop_seed:
+            return
+
+        tasks = Queue(self.max_in_flight)
+        results = Queue(self.max_in_flight)
+        workers = [Process(target=_corpus_worker, daemon=True,
+                           args=(tasks, results, self.floor_generator, self.floor_number, self.adaptive_placement))
+                   for _ in range(self.workers)]
+        for worker in workers:
+            worker.start()
+
+        try:
+            self._write_shards(self._generate(tasks, results, workers, start_seed, stop_seed))
+        except BaseException:
+            # Workers may be blocked on a full queue, so they are stopped rather than asked to finish
+            for worker in workers:
+                worker.terminate()
+            raise
+
+        for _ in workers:
+            tasks.put(None)
+        for worker in workers:
+            worker.join()
+
+    def _generate(self, tasks: Queue, results: Queue, workers: list, start_seed: int, stop_seed: int):
+        """Yield (seed, serialized floor) records in seed order while keeping a bounded number of batches queued"""
+        batches = iter(range(start_seed, stop_seed, self.batch_size))
+        next_batch = next(batches, None)
+        in_flight = 0
+        finished = {}
+        expected = start_seed
+
+        while expected < stop_seed:
+            # Queue more work while there is capacity for it
+            while next_batch is not None and in_flight < self.max_in_flight:
+                tasks.put((next_batch, min(next_batch + self.batch_size, stop_seed)))
+                next_batch = next(batches, None)
+                in_flight += 1
+
+            # Batches may complete out of order, so hold them until every earlier batch has been written
+            batch_start, records = self._next_result(results, workers)
+            if isinstance(records, Exception):
+                raise Exception(f"Generating the batch starting at seed {batch_start} failed.") from records
+            in_flight -= 1
+            finished[batch_start] = records
+            while expected in finished:
+                records = finished.pop(expected)
+                yield from records
+                expected += len(records)
+
+    @staticmethod
+    def _next_result(results: Queue, workers: list):
+        """Wait for the next finished batch, failing instead of waiting forever if a worker has died"""
+        while True:
+            try:
+                return results.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                if not all(worker.is_alive() for worker in workers):
+                    raise Exception("A corpus worker exited before finishing its batch.")
+
+    def _write_shards(self, records):
+        shard = None
+        for seed, data in records:
+            record_size = RECORD_HEADER_SIZE + len(data)
+            if shard is not None and shard.size + record_size > self.shard_bytes:
+                self._complete_shard(shard)
+                shard = None
+
+            if shard is None:
+                shard = ShardWriter(self.directory, len(self.manifest["shards"]), seed)
+            shard.write(seed, data)
+
+        if shard is not None:
+            self._complete_shard(shard)
+
+    def _complete_shard(self, shard):
+        self.manifest["shards"].append(shard.close())
+        write_manifest(self.directory, self.manifest)
+
+
+class ShardWriter:
+    """Writes records to a temporary shard file, which is renamed into place once complete"""
+    name = None
+    path = None
+    start_seed = None
+    stop_seed = None
+    size = None
+    offsets = None
+    checksum = None
+    file = None
+
+    def __init__(self, directory: str, shard_number: int, start_seed: int):
+        self.name = f"shard_{shard_number:05d}"
+        self.path = os.path.join(directory, self.name)
+        self.start_seed = start_seed
+        self.stop_seed = start_seed
+        self.offsets = []
+        self.checksum = hashlib.sha256(SHARD_HEADER)
+        self.file = open(self.path + ".dat.tmp", "wb")
+        self.file.write(SHARD_HEADER)
+        self.size = len(SHARD_HEADER)
+
+    def write(self, seed: int, data: bytes):
+        record = struct.pack(RECORD_HEADER_FORMAT, seed, len(data)) + data
+        self.offsets.append(self.size)
+        self.file.write(record)
+        self.checksum.update(record)
+        self.size += len(record)
+        self.stop_seed = seed + 1
+
+    def close(self) -> dict:
+        """Finish the shard and its index, and return the shard's manifest entry"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.path + ".dat.tmp", self.path + ".dat")
+
+        with open(self.path + ".idx.tmp", "wb") as index_file:
+            index_file.write(b"".join(struct.pack(INDEX_FORMAT, offset) for offset in self.offsets))
+        os.replace(self.path + ".idx.tmp", self.path + ".idx")
+
+        return {
+            "name": self.name,
+            "start_seed": self.start_seed,
+            "stop_seed": self.stop_seed,
+            "records": len(self.offsets),
+            "size": self.size,
+            "sha256": self.checksum.hexdigest(),
+        }
+
+
+def read_manifest(directory: str):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def write_manifest(directory: str, manifest: dict):
+    """Replace the manifest atomically, so an interruption never leaves a partially written manifest"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def verify_shard(directory: str, shard: dict) -> bool:
+    """Check a shard's size and checksum against its manifest entry"""
+    checksum = hashlib.sha256()
+    size = 0
+    with open(os.path.join(directory, shard["name"] + ".dat"), "rb") as shard_file:
+        for chunk in iter(lambda: shard_file.read(1024 * 1024), b""):
+            checksum.update(chunk)
+            size += len(chunk)
+    return size == shard["size"] and checksum.hexdigest() == shard["sha256"]
+
+
+def read_record(directory: str, shard: dict, record_number: int):
+    """Read a single (seed, serialized floor) record using the shard's index"""
+    with open(os.path.join(directory, shard["name"] + ".idx"), "rb") as index_file:
+        index_file.seek(record_number * INDEX_ENTRY_SIZE)
+        offset, = struct.unpack(INDEX_FORMAT, index_file.read(INDEX_ENTRY_SIZE))
+
+    with open(os.path.join(directory, shard["name"] + ".dat"), "rb") as shard_file:
+        shard_file.seek(offset)
+        seed, length = struct.unpack(RECORD_HEADER_FORMAT, shard_file.read(RECORD_HEADER_SIZE))
+        return seed, shard_file.read(length)
+
+
+def iter_corpus(directory: str):
+    """Yield every (seed, serialized floor) record in the corpus, in seed order"""
+    for shard in read_manifest(directory)["shards"]:
+        with open(os.path.join(directory, shard["name"] + ".dat"), "rb") as shard_file:
+            if shard_file.read(len(SHARD_HEADER)) != SHARD_HEADER:
+                raise Exception(f"Invalid shard file {shard['name']}.")
+
+            for _ in range(shard["records"]):
+                seed, length = struct.unpack(RECORD_HEADER_FORMAT, shard_file.read(RECORD_HEADER_SIZE))
+                yield seed, shard_file.read(length)
+
+
+if __name__ == '__main__':
+    CorpusWriter(sys.argv[1]).build(int(sys.argv[2]), int(sys.argv[3]))
@@ -0,0 +1,206 @@
+import struct
+
+from lib.DungeonFloor import DungeonFloor
+from lib.DungeonTile import DungeonTile
+from lib.FloorSerializer import TILE_FLAGS
+
+# Operation codes
+ADD_TILE = 0
+REMOVE_TILE = 1
+SET_FLAG = 2
+
+# Room index stored for tiles which do not belong to a room
+NO_ROOM = 255
+
+# Flag values are stored in one byte each
+FLAG_VALUES = (False, True, None)
+
+HEADER_FORMAT = "<BiBH"  # generator version, floor number, adaptive placement, seed length
+OPERATION_FORMATS = {
+    ADD_TILE: "<BBBB",  # x, y, room index, is_alcove
+    REMOVE_TILE: "<BB",  # x, y
+    SET_FLAG: "<BBBB",  # x, y, flag index, value index
+}
+
+
+class FloorDelta:
+    """Stores a player-modified floor as its seed plus a log of changes made since generation.
+
+    Every change to the floor should be made through this class so it is recorded. Loading regenerates the base floor
+    from its seed and replays the log. Rooms are referred to by their position in the generated floor's rooms, which
+    is the same every time the seed is regenerated.
+    """
+    # Once the log grows past this many operations, and to twice its length after the last compaction, it is rewritten
+    # as the minimal difference from the base floor. A difference which is itself long is therefore not rebuilt on
+    # every later change
+    COMPACT_THRESHOLD = 256
+
+    seed = None
+    floor_number = None
+    adaptive_placement = None
+    operations = None
+    compacted_length = None
+    floor = None
+
+    def __init__(self, seed, floor_number: int, adaptive_placement: bool = False, operations: list = None):
+        self.seed = str(seed)
+        self.floor_number = floor_number
+        self.adaptive_placement = adaptive_placement
+        self.operations = operations or []
+        self.compacted_length = 0
+        self.floor = self.load()
+
+    def generate_base(self) -> DungeonFloor:
+        return DungeonFloor.from_seed(self.seed, self.floor_number, self.adaptive_placement)
+
+    def load(self) -> DungeonFloor:
+        """Regenerate the base floor and replay every recorded operation on it"""
+        floor = self.generate_base()
+        for operation in self.operations:
+            apply_operation(floor, operation)
+        return floor
+
+    def record(self, operation: tuple):
+        apply_operation(self.floor, operation)
+        self.operations.append(operation)
+        if len(self.operations) > max(self.COMPACT_THRESHOLD, 2 * self.compacted_length):
+            self.compact()
+
+    def add_tile(self, x: int, y: int, room_index: int = None, is_alcove: bool = False):
+        """Add a tile to an empty grid position. Tiles without a room are connectors"""
+        if self.floor.floor_grid[x][y] is not None:
+            raise Exception(f"Unable to add a tile at ({x}, {y}), which is already occupied.")
+        self.record((ADD_TILE, x, y, NO_ROOM if room_index is None else room_index, int(is_alcove)))
+
+    def remove_tile(self, x: int, y: int):
+        self.record((REMOVE_TILE, x, y))
+
+    def set_flag(self, x: int, y: int, flag: str, value):
+        """Set one of the tile attributes listed in TILE_FLAGS, such as `has_pitfall`"""
+        self.record((SET_FLAG, x, y, TILE_FLAGS.index(flag), FLAG_VALUES.index(value)))
+
+    def compact(self):
+        """Replace the log with the minimal set of operations which turns the base floor into the current floor"""
+        self.operations = diff_floors(self.generate_base(), self.floor)
+        self.compacted_length = len(self.operations)
+
+    def to_bytes(self) -> bytes:
+        seed = self.seed.encode("utf-8")
+        output = bytearray(struct.pack(HEADER_FORMAT, DungeonFloor.GENERATOR_VERSION, self.floor_number,
+                                       self.adaptive_placement, len(seed)))
+        output += seed
+        for operation in self.operations:
+            output.append(operation[0])
+            output += struct.pack(OPERATION_FORMATS[operation[0]], *operation[1:])
+        return bytes(output)
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """Load a delta written by `to_bytes`. Deltas from another generator version describe a different base floor,
+        so they are refused"""
+        version, floor_number, adaptive_placement, seed_length = struct.unpack_from(HEADER_FORMAT, data)
+        if version != DungeonFloor.GENERATOR_VERSION:
+            raise Exception(f"Floor delta was recorded with generator version {version}, but the current version is "
+                            f"{DungeonFloor.GENERATOR_VERSION}.")
+        offset = struct.calcsize(HEADER_FORMAT)
+        seed = data[offset:offset + seed_length].decode("utf-8")
+        offset += seed_length
+
+        operations = []
+        while offset < len(data):
+            operation_format = OPERATION_FORMATS[data[offset]]
+            operations.append((data[offset],) + struct.unpack_from(operation_format, data, offset + 1))
+            offset += 1 + struct.calcsize(operation_format)
+
+        return cls(seed, floor_number, bool(adaptive_placement), operations)
+
+
+def apply_operation(floor: DungeonFloor, operation: tuple):
+    if operation[0] == ADD_TILE:
+        _, x, y, room_index, is_alcove = operation
+        if room_index == NO_ROOM:
+            floor.place_tile(x, y, DungeonTile(room_id=None, is_connector=True))
+        else:
+            room = tuple(floor.rooms.values())[room_index]
+            floor.place_tile(x, y, DungeonTile(room_id=room.room_id, is_alcove=bool(is_alcove)))
+            room.occupied_tiles.append([x, y])
+
+    elif operation[0] == REMOVE_TILE:
+        floor.remove_tile(operation[1], operation[2])
+
+    elif operation[0] == SET_FLAG:
+        _, x, y, flag_index, value_index = operation
+        setattr(floor.tiles[floor.floor_grid[x][y]], TILE_FLAGS[flag_index], FLAG_VALUES[value_index])
+
+
+def _describe_tile(floor: DungeonFloor, room_indexes: dict, tile_id: str):
+    if tile_id is None:
+        return None
+    tile = floor.tiles[tile_id]
+    return NO_ROOM if tile.room_id is None else room_indexes[tile.room_id], int(bool(tile.is_alcove))
+
+
+def _kept_room_tiles(base: DungeonFloor, current: DungeonFloor, base_room, current_room) -> set:
+    """Tiles of a room which can stay in place when replaying a diff, without changing the room's tile order.
+
+    Replaying removes tiles from a room's base order and appends added tiles at its end. The kept tiles are therefore
+    the longest prefix of the current order which appears in the same order in the base room, with unchanged alcoves.
+    """
+    base_order = [(x, y) for x, y in base_room.occupied_tiles]
+    base_index = 0
+    kept = set()
+    for x, y in current_room.occupied_tiles:
+        while base_index < len(base_order) and base_order[base_index] != (x, y):
+            base_index += 1
+        if base_index == len(base_order) or \
+                base.tiles[base.floor_grid[x][y]].is_alcove != current.tiles[current.floor_grid[x][y]].is_alcove:
+            break
+        kept.add((x, y))
+        base_index += 1
+
+    return kept
+
+
+def diff_floors(base: DungeonFloor, current: DungeonFloor) -> list:
+    """Operations which turn `base` into `current`. Both floors must have been generated from the same seed.
+
+    Replaying the operations on `base` reproduces `current` exactly, including the order of each room's tiles, which
+    decides where the party starts. Tiles which moved within that order are removed and added again.
+    """
+    base_rooms = {room_id: index for index, room_id in enumerate(base.rooms)}
+    current_rooms = {room_id: index for index, room_id in enumerate(current.rooms)}
+
+    kept = set()
+    for base_room, current_room in zip(base.rooms.values(), current.rooms.values()):
+        kept |= _kept_room_tiles(base, current, base_room, current_room)
+
+    removals = []
+    connectors = []
+    flags = []
+    for x in range(len(base.floor_grid)):
+        for y in range(len(base.floor_grid[x])):
+            base_tile = _describe_tile(base, base_rooms, base.floor_grid[x][y])
+            current_tile = _describe_tile(current, current_rooms, current.floor_grid[x][y])
+            unchanged = base_tile == current_tile and (base_tile is None or base_tile[0] == NO_ROOM or (x, y) in kept)
+
+            if base_tile is not None and not unchanged:
+                removals.append((REMOVE_TILE, x, y))
+
+            if current_tile is None:
+                continue
+
+            # Room tiles are added afterwards, in the order they appear in their room
+            if not unchanged and current_tile[0] == NO_ROOM:
+                connectors.append((ADD_TILE, x, y) + current_tile)
+
+            # Flags of a replaced tile are compared against a freshly added tile, which has none set
+            tile = current.tiles[current.floor_grid[x][y]]
+            base_flags = base.tiles[base.floor_grid[x][y]] if unchanged else None
+            for flag_index, flag in enumerate(TILE_FLAGS):
+                if getattr(tile, flag) != getattr(base_flags, flag, None):
+                    flags.append((SET_FLAG, x, y, flag_index, FLAG_VALUES.index(getattr(tile, flag))))
+
+    room_tiles = [(ADD_TILE, x, y) + _describe_tile(current, current_rooms, current.floor_grid[x][y])
+                  for room in current.rooms.values() for x, y in room.occupied_tiles if (x, y) not in kept]
+
+    return removals + connectors + room_tiles + flags
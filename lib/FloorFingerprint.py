@@ -0,0 +1,75 @@
+import hashlib
+
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorSerializer import ALCOVE_CHAR, CONNECTOR_CHAR, EMPTY_CHAR, ROOM_CHAR, tile_kind_rows
+
+# Each cell is packed into two bits, so a whole 32x32 floor packs into 256 bytes
+PACKED_DIGITS = str.maketrans({EMPTY_CHAR: "0", ROOM_CHAR: "1", ALCOVE_CHAR: "2", CONNECTOR_CHAR: "3"})
+
+
+def pack_rows(rows: list) -> bytes:
+    """Pack a grid of tile kind characters into bytes, two bits per cell"""
+    cells = "".join(rows)
+    return int(cells.translate(PACKED_DIGITS), 4).to_bytes((len(cells) + 3) // 4, "big")
+
+
+def symmetries(rows: list):
+    """Yield the grid in every rotation, and every rotation of its mirror image"""
+    for grid in (rows, [row[::-1] for row in rows]):
+        for _ in range(4):
+            yield grid
+            grid = ["".join(column) for column in zip(*grid[::-1])]
+
+
+def fingerprint_rows(rows: list, invariant: bool = False) -> str:
+    """Fingerprint a grid of tile kind characters, as produced by `tile_kind_rows`.
+
+    With `invariant`, every rotation and mirror image of a layout shares the same fingerprint.
+    """
+    if invariant:
+        packed = min(pack_rows(grid) for grid in symmetries(rows))
+    else:
+        packed = pack_rows(rows)
+    return hashlib.blake2b(packed, digest_size=16).hexdigest()
+
+
+def floor_fingerprint(floor: DungeonFloor, invariant: bool = False) -> str:
+    """Fingerprint the layout of a floor. Randomly generated tile and room ids do not affect the result"""
+    return fingerprint_rows(tile_kind_rows(floor), invariant)
+
+
+class FingerprintIndex:
+    """Deduplicates floors across a corpus by their layout fingerprint.
+
+    Data derived from a floor, such as a Lua export, can be cached per fingerprint and reused by every identical
+    floor.
+    """
+    invariant = None
+    floors = None
+    derived = None
+
+    def __init__(self, invariant: bool = False):
+        self.invariant = invariant
+        self.floors = {}
+        self.derived = {}
+
+    def add(self, key, floor: DungeonFloor):
+        """Record a floor under a key such as its seed. Returns the fingerprint and whether the layout is new"""
+        fingerprint = floor_fingerprint(floor, self.invariant)
+        is_new = fingerprint not in self.floors
+        self.floors.setdefault(fingerprint, []).append(key)
+        return fingerprint, is_new
+
+    def lookup(self, fingerprint: str):
+        """Keys of every floor recorded with the given fingerprint"""
+        return self.floors.get(fingerprint, [])
+
+    def duplicate_count(self) -> int:
+        return sum(len(keys) - 1 for keys in self.floors.values())
+
+    def get_derived(self, fingerprint: str, name: str, factory):
+        """Return cached data derived from a layout, calling `factory()` to build it the first time it is needed"""
+        cache_key = (fingerprint, name)
+        if cache_key not in self.derived:
+            self.derived[cache_key] = factory()
+        return self.derived[cache_key]
@@ -0,0 +1,115 @@
+import colorsys
+import struct
+import sys
+import zlib
+
+from lib.DungeonFloor import DungeonFloor
+
+# Cell values of a rendered floor. Rooms are numbered from ROOM_START in the order they were created
+PADDING = 0
+EMPTY = 1
+CONNECTOR = 2
+ALCOVE = 3
+ROOM_START = 4
+
+# Same characters as the ASCII preview has always used, alcoves being drawn as part of their room
+ASCII_CELLS = {EMPTY: "- ", CONNECTOR: "O ", ALCOVE: "X "}
+ASCII_TABLE = {value: ASCII_CELLS.get(value, "X ") for value in range(256)}
+
+# Rooms cycle through a set of distinct hues
+ROOM_COLORS = [tuple(round(channel * 255) for channel in colorsys.hsv_to_rgb(hue / 12, .55, .9)) for hue in range(12)]
+PALETTE = [(0, 0, 0), (40, 40, 40), (200, 200, 200), (255, 215, 0)] + \
+          [ROOM_COLORS[i % len(ROOM_COLORS)] for i in range(256 - ROOM_START)]
+
+
+def cell_rows(floor: DungeonFloor):
+    """Describe a floor as one bytes object per grid row, one byte per cell, using the cell values above"""
+    row_length = len(floor.floor_grid[0])
+    cells = bytearray([EMPTY]) * (len(floor.floor_grid) * row_length)
+
+    # Connectors are the only tiles which belong to no room, so every occupied cell starts out as one. Only the set
+    # bits of each occupancy row are visited
+    for x, occupied in enumerate(floor.occupancy_rows[1:-1]):
+        while occupied:
+            lowest_bit = occupied & -occupied
+            cells[x * row_length + lowest_bit.bit_length() - 2] = CONNECTOR
+            occupied ^= lowest_bit
+
+    for room_number, room in enumerate(floor.rooms.values()):
+        value = ROOM_START + room_number % (256 - ROOM_START)
+        for x, y in room.occupied_tiles:
+            cells[x * row_length + y] = ALCOVE if floor.tiles[floor.floor_grid[x][y]].is_alcove else value
+
+    return [bytes(cells[i:i + row_length]) for i in range(0, len(cells), row_length)]
+
+
+def render_ascii(floor: DungeonFloor) -> str:
+    """Render a floor as text, one line per grid row"""
+    return "\n".join(row.decode("latin-1").translate(ASCII_TABLE) for row in cell_rows(floor))
+
+
+def encode_png(width: int, height: int, palette: list, scanlines) -> bytes:
+    """Encode an 8-bit paletted PNG image. `scanlines` yields `height` rows of `width` palette indexes each, and is
+    compressed as it is consumed"""
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + chunk_type + data + \
+            struct.pack(">I", zlib.crc32(chunk_type + data) & 0xffffffff)
+
+    compressor = zlib.compressobj()
+    image_data = bytearray()
+    for scanline in scanlines:
+        # Each scanline is preceded by its filter type, which is always None
+        image_data += compressor.compress(b"\x00" + scanline)
+    image_data += compressor.flush()
+
+    return b"\x89PNG\r\n\x1a\n" + \
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)) + \
+        chunk(b"PLTE", b"".join(bytes(color) for color in palette)) + \
+        chunk(b"IDAT", bytes(image_data)) + \
+        chunk(b"IEND", b"")
+
+
+def render_contact_sheet(floors, columns: int = 16, scale: int = 4, padding: int = 1) -> bytes:
+    """Render floors side by side into a single PNG image, `columns` floors per row, each cell `scale` pixels wide"""
+    sheets = [cell_rows(floor) for floor in floors]
+    if not sheets:
+        raise Exception("At least one floor is required to render a contact sheet.")
+
+    grid_height = len(sheets[0])
+    grid_width = len(sheets[0][0])
+    columns = min(columns, len(sheets))
+    rows = (len(sheets) + columns - 1) // columns
+    tile_width = grid_width * scale + padding
+    tile_height = grid_height * scale + padding
+    width = columns * tile_width + padding
+    height = rows * tile_height + padding
+
+    def scale_row(row: bytes) -> bytes:
+        return b"".join(bytes((cell,)) * scale for cell in row)
+
+    def scanlines():
+        blank_line = bytes(width)
+        padding_bytes = bytes(padding)
+        for _ in range(padding):
+            yield blank_line
+
+        for sheet_row in range(rows):
+            floors_in_row = sheets[sheet_row * columns:(sheet_row + 1) * columns]
+            for grid_row in range(grid_height):
+                line = padding_bytes + b"".join(scale_row(sheet[grid_row]) + padding_bytes for sheet in floors_in_row)
+                line += bytes(width - len(line))
+                for _ in range(scale):
+                    yield line
+            for _ in range(padding):
+                yield blank_line
+
+    return encode_png(width, height, PALETTE, scanlines())
+
+
+if __name__ == '__main__':
+    output_path, start_seed, stop_seed = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    image = render_contact_sheet(DungeonFloor.from_seed(seed, 1) for seed in range(start_seed, stop_seed))
+
+    f = open(output_path, "wb")
+    f.write(image)
+    f.close()
@@ -0,0 +1,101 @@
+import json
+
+from lib.DungeonFloor import DungeonFloor
+from lib.DungeonRoom import DungeonRoom
+from lib.DungeonTile import DungeonTile
+
+# Characters used to describe each grid cell, matching the ASCII preview printed by `generate.py`
+EMPTY_CHAR = "-"
+ROOM_CHAR = "X"
+ALCOVE_CHAR = "A"
+CONNECTOR_CHAR = "O"
+
+# Tile attributes which are only stored when they have been set
+TILE_FLAGS = ("has_pitfall", "has_stairs", "has_teleporter", "can_move_north", "can_move_south", "can_move_east",
+              "can_move_west", "can_move_up", "can_move_down")
+
+
+def tile_kind_rows(floor: DungeonFloor):
+    """Describe the floor grid as one string per row, using a single character per cell"""
+    rows = []
+    for row in floor.floor_grid:
+        kinds = []
+        for tile_id in row:
+            tile = floor.tiles[tile_id] if tile_id else None
+            if tile is None:
+                kinds.append(EMPTY_CHAR)
+            elif tile.is_connector:
+                kinds.append(CONNECTOR_CHAR)
+            elif tile.is_alcove:
+                kinds.append(ALCOVE_CHAR)
+            else:
+                kinds.append(ROOM_CHAR)
+        rows.append("".join(kinds))
+    return rows
+
+
+def floor_to_dict(floor: DungeonFloor):
+    """Convert a floor into plain data. Randomly generated tile and room ids are not kept"""
+    flags = []
+    for x, row in enumerate(floor.floor_grid):
+        for y, tile_id in enumerate(row):
+            if tile_id is None:
+                continue
+
+            tile = floor.tiles[tile_id]
+            tile_flags = {flag: getattr(tile, flag) for flag in TILE_FLAGS if getattr(tile, flag) is not None}
+            if tile_flags:
+                flags.append([x, y, tile_flags])
+
+    return {
+        "floor_number": floor.floor_number,
+        "grid": tile_kind_rows(floor),
+        "rooms": [{
+            "tiles": [list(coords) for coords in room.occupied_tiles],
+            "is_connected": room.is_connected,
+            "is_expansive": room.is_expansive,
+        } for room in floor.rooms.values()],
+        "flags": flags,
+    }
+
+
+def floor_from_dict(data: dict):
+    """Rebuild a floor from the output of `floor_to_dict` without running generation"""
+    floor = DungeonFloor.__new__(DungeonFloor)
+    floor.floor_number = data["floor_number"]
+    floor.floor_grid = [[None for _ in row] for row in data["grid"]]
+    floor.rooms = {}
+    floor.tiles = {}
+    floor.occupancy_rows = [0] * 34
+
+    for room_data in data["rooms"]:
+        room = DungeonRoom(floor.floor_number, [list(coords) for coords in room_data["tiles"]])
+        room.set_connected(room_data["is_connected"])
+        room.set_expansive(room_data["is_expansive"])
+        floor.rooms[room.room_id] = room
+
+        for x, y in room.occupied_tiles:
+            floor.place_tile(x, y, DungeonTile(room_id=room.room_id, is_alcove=(data["grid"][x][y] == ALCOVE_CHAR)))
+
+    # Anything left on the grid which does not belong to a room is a connector
+    for x, row in enumerate(data["grid"]):
+        for y, kind in enumerate(row):
+            if kind == CONNECTOR_CHAR:
+                floor.place_tile(x, y, DungeonTile(room_id=None, is_connector=True))
+
+    for x, y, tile_flags in data["flags"]:
+        tile = floor.tiles[floor.floor_grid[x][y]]
+        for flag, value in tile_flags.items():
+            setattr(tile, flag, value)
+
+    return floor
+
+
+def serialize_floor(floor: DungeonFloor) -> bytes:
+    """Serialize a floor to compact JSON bytes"""
+    return json.dumps(floor_to_dict(floor), separators=(",", ":")).encode("utf-8")
+
+
+def deserialize_floor(data: bytes) -> DungeonFloor:
+    """Rebuild a floor from the output of `serialize_floor`"""
+    return floor_from_dict(json.loads(data))
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorSerializer import deserialize_floor, serialize_floor
+
+
+def _warm_up():
+    """Executed once per worker so the first real request does not pay for process startup and imports"""
+    return os.getpid()
+
+
+def _generate_serialized_floor(seed, floor_number: int) -> bytes:
+    return serialize_floor(DungeonFloor.from_seed(seed, floor_number))
+
+
+class FloorCache:
+    """Least recently used cache of serialized floors, bounded by the total size of the cached data"""
+    max_bytes = None
+    size = None
+    entries = None
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+        return data
+
+    def put(self, key, data: bytes):
+        # Entries larger than the whole cache are never stored
+        if len(data) > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+
+        self.entries[key] = data
+        self.size += len(data)
+
+        # Evict the least recently used entries until the cache fits within its budget again
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class FloorService:
+    """Generates floors on a pool of worker processes so generation never blocks the event loop.
+
+    Concurrent requests for the same seed and floor number share a single generation, and finished floors are kept
+    in a size-bounded LRU cache of serialized floors.
+    """
+    max_workers = None
+    cache = None
+    executor = None
+    startup = None
+    pending = None
+
+    def __init__(self, max_workers: int = None, cache_bytes: int = 64 * 1024 * 1024):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = FloorCache(cache_bytes)
+        self.pending = {}
+
+    async def start(self):
+        """Create the worker pool and start every worker ahead of the first request. Safe to call repeatedly"""
+        if self.startup is None:
+            self.startup = asyncio.ensure_future(self._start_workers())
+        await self.startup
+
+    async def _start_workers(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.max_workers)))
+
+    async def stop(self):
+        """Shut down the worker pool, waiting for it on a separate thread so the event loop keeps running"""
+        if self.executor is not None:
+            executor = self.executor
+            self.executor = None
+            self.startup = None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def generate_floor_bytes(self, seed, floor_number: int) -> bytes:
+        """Return the serialized floor for a seed, generating it if it is not already cached or in progress"""
+        # Seeds are hashed as strings during generation, so 7 and "7" describe the same floor
+        key = (str(seed), floor_number)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+
+        # Another request for this floor is already being generated, so wait for its result instead
+        if key in self.pending:
+            return await asyncio.shield(self.pending[key])
+
+        # The entry is removed once generation itself finishes, so it outlives callers which are cancelled
+        generation = asyncio.ensure_future(self._generate(key))
+        self.pending[key] = generation
+        generation.add_done_callback(lambda _: self.pending.pop(key, None))
+        return await asyncio.shield(generation)
+
+    async def _generate(self, key) -> bytes:
+        await self.start()
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self.executor, _generate_serialized_floor, *key)
+        self.cache.put(key, data)
+        return data
+
+    async def generate_floor(self, seed, floor_number: int) -> DungeonFloor:
+        return deserialize_floor(await self.generate_floor_bytes(seed, floor_number))
+
+    async def handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve `GET /floor?seed=<seed>&floor=<floor number>` with the serialized floor as JSON"""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            # Skip the request headers, none of them are used
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            status, body = "404 Not Found", json.dumps({"error": "Not found"}).encode("utf-8")
+            if len(request_line) >= 2 and request_line[0] == "GET":
+                url = urlsplit(request_line[1])
+                query = parse_qs(url.query)
+                if url.path == "/floor":
+                    status, body = await self._floor_response(query)
+
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _floor_response(self, query: dict):
+        """Status and body for a floor request. Only invalid parameters are the client's fault"""
+        try:
+            seed = query["seed"][0]
+            floor_number = int(query.get("floor", ["1"])[0])
+        except (KeyError, ValueError):
+            return "400 Bad Request", json.dumps({"error": "A seed and an integer floor are required"}).encode("utf-8")
+
+        try:
+            return "200 OK", await self.generate_floor_bytes(seed, floor_number)
+        except Exception as error:
+            logging.exception(f"Generating floor {floor_number} for seed {seed} failed.")
+            body = json.dumps({"error": f"Floor generation failed: {error}"}).encode("utf-8")
+            return "500 Internal Server Error", body
+
+    async def serve_http(self, host: str = "127.0.0.1", port: int = 8080):
+        server = await asyncio.start_server(self.handle_http, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+_default_service = None
+
+
+async def generate_floor(seed, floor_number: int) -> DungeonFloor:
+    """Generate a single floor off the event loop using a shared, lazily started service"""
+    global _default_service
+    if _default_service is None:
+        _default_service = FloorService()
+    return await _default_service.generate_floor(seed, floor_number)
+
+
+async def _main(port: int):
+    async with FloorService() as service:
+        await service.serve_http(port=port)
+
+
+if __name__ == '__main__':
+    asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 8080))
@@ -0,0 +1,76 @@
+import random
+
+
+class FreeSpaceIndex:
+    """Tracks where new rooms can still be placed on a 32x32 floor.
+
+    A room may cover a cell only if neither the cell nor any orthogonally adjacent cell is occupied, which is the
+    rule enforced by DungeonFloor.validate_room_placement. Bit y of `free_rows[x]` is set while a room may still
+    cover cell (x, y), so every free rectangle of a given size can be found with a handful of bit operations per row.
+    """
+    SIZE = 32
+    FULL_ROW = (1 << SIZE) - 1
+
+    free_rows = None
+
+    def __init__(self):
+        self.free_rows = [self.FULL_ROW] * self.SIZE
+
+    def occupy(self, x: int, y: int):
+        """Record that cell (x, y) has been occupied"""
+        self.free_rows[x] &= ~(0b111 << y >> 1)
+        if x > 0:
+            self.free_rows[x - 1] &= ~(1 << y)
+        if x < self.SIZE - 1:
+            self.free_rows[x + 1] &= ~(1 << y)
+
+    def position_rows(self, width: int, height: int):
+        """For each x from which a width by height rectangle could start, the bit mask of valid starting y values"""
+        # Reduce each row to the columns which start a run of `height` free cells
+        runs = []
+        for row in self.free_rows:
+            run = row
+            for shift in range(1, height):
+                run &= row >> shift
+            runs.append(run)
+
+        # Then keep only the columns where `width` consecutive rows all start such a run
+        position_rows = []
+        for x in range(0, self.SIZE - width + 1):
+            row = runs[x]
+            for i in range(1, width):
+                row &= runs[x + i]
+            position_rows.append(row)
+
+        return position_rows
+
+    def positions(self, width: int, height: int):
+        """Every (x, y) at which a width by height rectangle can be placed"""
+        positions = []
+        for x, row in enumerate(self.position_rows(width, height)):
+            # Visit only the set bits, lowest first
+            while row:
+                lowest_bit = row & -row
+                positions.append((x, lowest_bit.bit_length() - 1))
+                row ^= lowest_bit
+        return positions
+
+    def fits(self, width: int, height: int) -> bool:
+        return any(self.position_rows(width, height))
+
+    def random_position(self, width: int, height: int):
+        """A uniformly random (x, y) at which a width by height rectangle can be placed, or None if there is none"""
+        position_rows = self.position_rows(width, height)
+        counts = [bin(row).count("1") for row in position_rows]
+        total = sum(counts)
+        if not total:
+            return None
+
+        choice = random.randrange(total)
+        for x, row in enumerate(position_rows):
+            if choice < counts[x]:
+                # Clear the lowest set bits until the chosen one is the lowest remaining
+                for _ in range(choice):
+                    row &= row - 1
+                return x, (row & -row).bit_length() - 1
+            choice -= counts[x]
@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+# Rooms only range from 2 to 8 tiles in each dimension with an alcove of at most 2 tiles, so the geometry of every
+# possible room is built once per process and shared by every room of the same shape.
+
+# Alcove placements, matching DungeonFloor.determine_room_placement
+NO_ALCOVE = None
+ALCOVE_WIDTH = 1  # Alcove placed in an extra column after the room
+ALCOVE_HEIGHT = 2  # Alcove placed in an extra row after the room
+
+
+class RoomFootprint:
+    width = None
+    height = None
+    alcove_placement = None
+    effective_width = None
+    effective_height = None
+
+    # Offsets of every tile of the room from its top left corner
+    room_offsets = None
+
+    # For each alcove size, a tuple containing the tile offsets of every possible alcove position
+    alcove_candidates = None
+
+    # Bit masks of the area which must be unoccupied to place the room, see `validation_rows`
+    validation_rows = None
+
+    def __init__(self, width: int, height: int, alcove_placement: int):
+        self.width = width
+        self.height = height
+        self.alcove_placement = alcove_placement
+        self.effective_width = width + (1 if alcove_placement == ALCOVE_WIDTH else 0)
+        self.effective_height = height + (1 if alcove_placement == ALCOVE_HEIGHT else 0)
+        self.room_offsets = tuple((x, y) for x in range(width) for y in range(height))
+
+        self.alcove_candidates = {}
+        for alcove_size in (1, 2):
+            if alcove_placement == ALCOVE_WIDTH:
+                self.alcove_candidates[alcove_size] = tuple(
+                    tuple((width, y) for y in range(start, start + alcove_size))
+                    for start in range(0, height - alcove_size + 1)
+                )
+            elif alcove_placement == ALCOVE_HEIGHT:
+                self.alcove_candidates[alcove_size] = tuple(
+                    tuple((x, height) for x in range(start, start + alcove_size))
+                    for start in range(0, width - alcove_size + 1)
+                )
+
+        self.validation_rows = validation_rows(self.effective_width, self.effective_height)
+
+
+@lru_cache(maxsize=None)
+def get_footprint(width: int, height: int, alcove_placement: int) -> RoomFootprint:
+    return RoomFootprint(width, height, alcove_placement)
+
+
+@lru_cache(maxsize=None)
+def validation_rows(width: int, height: int):
+    """Area which must be unoccupied for a width by height rectangle to be placed: the rectangle itself plus every
+    tile orthogonally adjacent to it.
+
+    Row i describes grid row x_pos - 1 + i, and bit b of a row describes column y_pos - 1 + b, which lines up with the
+    padded occupancy rows kept by DungeonFloor.
+    """
+    edge_row = ((1 << height) - 1) << 1
+    inner_row = (1 << (height + 2)) - 1
+    return (edge_row,) + (inner_row,) * width + (edge_row,)
+
+
+@lru_cache(maxsize=None)
+def shrink_variants(width: int, height: int):
+    """Every room size no larger than width by height, largest area first. Among equal areas, sizes closest to the
+    requested proportions come first"""
+    sizes = [(w, h) for w in range(2, width + 1) for h in range(2, height + 1)]
+    return tuple(sorted(sizes, key=lambda size: (-size[0] * size[1], abs(size[0] * height - size[1] * width))))
@@ -83,18 +83,35 @@ class File:
     file_name_hash: int
     file: bytearray
 
-    def __init__(self, file_path: str):
-        """must be given a relative path starting from the location of the `.dungeon_editor` file"""
+    def __init__(self, file_path: str, data=None):
+        """must be given a relative path starting from the location of the `.dungeon_editor` file.
+
+        if `data` is given the file is virtual and nothing is read from disk. `data` may be bytes, a string or an
+        iterable of bytes/string chunks, which are compressed as they arrive
+        """
 
         # given the path it reads the file saves the size, compresses it saves the compressed size and calculates the
         # FNV1a-32 hash of the path_filename all for use later
-        with open(file_path, "rb") as f:
-            uncompressed_file = bytearray(f.read())
-            self.uncompressed_size = len(uncompressed_file)
-            self.file = bytearray(zlib.compress(uncompressed_file))
-            self.compressed_size = len(self.file)
-            self.file_name = '/'.join(file_path.split(os.path.sep))
-            self.file_name_hash = fnvhash.fnv1a_32(self.file_name.encode())
+        if data is None:
+            with open(file_path, "rb") as f:
+                data = f.read()
+
+        if isinstance(data, (str, bytes, bytearray, memoryview)):
+            data = (data,)
+
+        compressor = zlib.compressobj()
+        self.uncompressed_size = 0
+        self.file = bytearray()
+        for chunk in data:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            self.uncompressed_size += len(chunk)
+            self.file += compressor.compress(chunk)
+        self.file += compressor.flush()
+
+        self.compressed_size = len(self.file)
+        self.file_name = '/'.join(file_path.split(os.path.sep))
+        self.file_name_hash = fnvhash.fnv1a_32(self.file_name.encode())
 
 
 def __get_header_bytes():
@@ -251,6 +268,18 @@ def __create_directory_bytes(directory: list, dungeon_info: DungeonInfo):
     return byte_array, compressed_files
 
 
+def __assemble_dat_file(dungeon_info: DungeonInfo, directory: list) -> bytes:
+    """combines the headers, directory listing and compressed files into the bytes of a .dat file"""
+
+    directory_data, compressed_files_bytes = __create_directory_bytes(directory, dungeon_info)
+    output = __get_header_bytes()
+    output += __get_mod_info_header_bytes(directory, dungeon_info)
+    output += directory_data
+    output += dungeon_info.get_bytes()
+    output += compressed_files_bytes
+    return bytes(output)
+
+
 def package_dat_file(mod_directory: str) -> bytes:
     """packages files in `mod_directory` into a Legend of Grimrock 2 dat file.
 
@@ -266,13 +295,28 @@ def package_dat_file(mod_directory: str) -> bytes:
     """
 
     dungeon_info, directory = __scan_mod_directory(mod_directory)
-    directory_data, compressed_files_bytes = __create_directory_bytes(directory, dungeon_info)
-    output = __get_header_bytes()
-    output += __get_mod_info_header_bytes(directory, dungeon_info)
-    output += directory_data
-    output += dungeon_info.get_bytes()
-    output += compressed_files_bytes
-    return bytes(output)
+    return __assemble_dat_file(dungeon_info, directory)
+
+
+def package_virtual_dat_file(dungeon_info: DungeonInfo, virtual_files: dict) -> bytes:
+    """packages in-memory files into a Legend of Grimrock 2 dat file without touching the disk.
+
+    Parameters
+    ----------
+    dungeon_info : DungeonInfo
+        information that would otherwise be read from the `.dungeon_editor` file.
+    virtual_files : dict
+        maps the path of each file, relative to the mod root (e.g. `mod_assets/scripts/dungeon.lua`), to its
+        contents. contents may be bytes, a string or an iterable of bytes/string chunks.
+
+    Returns
+    -------
+    bytes
+        bytes of the .dat file that should be written to disk.
+    """
+
+    directory = [File(file_name, data) for file_name, data in virtual_files.items()]
+    return __assemble_dat_file(dungeon_info, directory)
 
 
 if __name__ == '__main__':
@@ -281,4 +325,3 @@ if __name__ == '__main__':
     f = open("out/testpackage.dat", "wb")
     f.write(data)
     f.close()
-
@@ -0,0 +1,57 @@
+import re
+import unittest
+
+from lib.DungeonExporter import FACING_STEPS, encode_row, is_floor, iter_dungeon_lua
+from lib.DungeonFloor import DungeonFloor
+
+
+class TestDungeonExporter(unittest.TestCase):
+    def test_encode_row(self):
+        self.assertEqual(encode_row("1122"), "\"1122\"")
+        self.assertEqual(encode_row("12" + "2" * 10 + "1"), "\"1222222222221\"")
+        self.assertEqual(encode_row("2" * 32), "(\"2\"):rep(32)")
+        self.assertEqual(encode_row("1" + "2" * 30 + "1"), "\"1\" .. (\"2\"):rep(30) .. \"1\"")
+
+    # Encoded rows must never be longer than their literal, and identical consecutive rows are written once
+    def test_layer_size(self, floor_count: int = 50):
+        floors = [DungeonFloor.from_seed(seed, 1) for seed in range(floor_count)]
+        lua = "".join(iter_dungeon_lua(floors))
+        for floor in floors:
+            for row in floor.floor_grid:
+                row = "".join("1" if col else "2" for col in row)
+                self.assertLessEqual(len(encode_row(row)), len(row) + 2)
+
+        layers = re.findall(r"loadLayer\(\"tiles\", expandRows\{\n(.*?)}\)", lua, re.S)
+        self.assertEqual(len(layers), floor_count)
+        for floor, layer in zip(floors, layers):
+            entries = layer.splitlines()
+            self.assertEqual(sum(int(entry.strip(",\t")) if entry.strip(",\t").isdigit() else 1 for entry in entries),
+                             len(floor.floor_grid))
+
+    # Chunks must be bounded by the buffer size, and together form one level per floor
+    def test_streamed_chunks(self, floor_count: int = 20):
+        chunks = list(iter_dungeon_lua((DungeonFloor(i) for i in range(floor_count)), buffer_size=1024))
+        self.assertTrue(all(len(chunk) < 2048 for chunk in chunks))
+        self.assertEqual("".join(chunks).count("newMap{"), floor_count)
+
+    # Every pair of consecutive levels must be linked by stairs at the same position, facing opposite ways
+    def test_linked_stairs(self, floor_count: int = 50):
+        floors = [DungeonFloor.from_seed(seed, 1) for seed in range(floor_count)]
+        lua = "".join(iter_dungeon_lua(floors))
+        spawns = re.findall(r'spawn\("(dungeon_stairs_\w+)", (\d+),(\d+),(\d),0, "\w+_(\d+)"\)', lua)
+        stairs = {(name, int(level)): (int(row), int(col), int(facing)) for name, col, row, facing, level in spawns}
+        self.assertEqual(len(stairs), 2 * (floor_count - 1))
+
+        start = re.search(r'spawn\("starting_location", (\d+),(\d+),', lua).groups()
+        for level in range(1, floor_count):
+            row, col, facing = stairs[("dungeon_stairs_down", level)]
+            self.assertEqual(stairs[("dungeon_stairs_up", level + 1)], (row, col, (facing + 2) % 4))
+            self.assertNotEqual((row, col), stairs.get(("dungeon_stairs_up", level), (None, None))[:2])
+            if level == 1:
+                self.assertNotEqual((str(col), str(row)), start)
+
+            # Both stairs are entered from an open tile in front of them
+            row_step, col_step = FACING_STEPS[facing][1]
+            self.assertTrue(floors[level - 1].floor_grid[row][col] and floors[level].floor_grid[row][col])
+            self.assertTrue(is_floor(floors[level - 1], row - row_step, col - col_step))
+            self.assertTrue(is_floor(floors[level], row + row_step, col + col_step))
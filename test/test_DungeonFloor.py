@@ -11,6 +11,47 @@ class TestDungeonFloor(unittest.TestCase):
         for col in floor.floor_grid:
             self.assertEqual(len(col), 32, f"Invalid column count {col} in floor: {len(col)}")
 
+    def assert_floor_consistent(self, floor: DungeonFloor):
+        grid_tiles = [tile_id for row in floor.floor_grid for tile_id in row if tile_id is not None]
+        self.assertEqual(len(grid_tiles), len(floor.tiles))
+        self.assertEqual(sum(bin(row).count("1") for row in floor.occupancy_rows), len(floor.tiles))
+
+        room_tile_count = 0
+        for room in floor.rooms.values():
+            room_tile_count += len(room.occupied_tiles)
+            for x, y in room.occupied_tiles:
+                self.assertEqual(floor.tiles[floor.floor_grid[x][y]].room_id, room.room_id)
+
+        connectors = [tile for tile in floor.tiles.values() if tile.is_connector]
+        self.assertEqual(room_tile_count + len(connectors), len(floor.tiles))
+
+        # Rooms keep a gap of at least one tile between each other, which only connectors may cross
+        for room in floor.rooms.values():
+            for x, y in room.occupied_tiles:
+                for adjacent_x, adjacent_y in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                    if 0 <= adjacent_x < 32 and 0 <= adjacent_y < 32 and floor.floor_grid[adjacent_x][adjacent_y]:
+                        self.assertIn(floor.tiles[floor.floor_grid[adjacent_x][adjacent_y]].room_id,
+                                      (room.room_id, None))
+
+    # Rooms, tiles and the floor grid must agree with each other once carving and connecting are complete
+    def test_tile_consistency(self, floor_count: int = 500):
+        for i in range(floor_count):
+            self.assert_floor_consistent(DungeonFloor(i))
+
+    # Adaptive placement shrinks rooms instead of dropping them, and must produce equally valid floors. Rooms are then
+    # only ever dropped for exceeding the area budget, never for failing to find space
+    def test_adaptive_placement(self, floor_count: int = 500):
+        unplaced = 0
+        for i in range(floor_count):
+            floor = DungeonFloor.from_seed(i, 1, adaptive_placement=True)
+            self.assert_floor_consistent(floor)
+            self.assertEqual(len(floor.rooms) + floor.rooms_dropped, floor.rooms_requested)
+            self.assertEqual(floor.rooms_unplaced, 0)
+            unplaced += DungeonFloor.from_seed(i, 1, adaptive_placement=False).rooms_unplaced
+
+        # The default placement does fail to find space for the same seeds
+        self.assertGreater(unplaced, 0)
+
     # Generate one thousand floors and make sure they all succeed
     def test_generation_consistency(self, floor_count: int = 10000):
         print(f"Generating {floor_count} floors...")
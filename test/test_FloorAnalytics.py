@@ -0,0 +1,36 @@
+import unittest
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorAnalytics import FloorStatistics, analyze_seeds, floor_metrics
+
+
+class TestFloorAnalytics(unittest.TestCase):
+    def test_statistics(self, floor_count: int = 200):
+        statistics = FloorStatistics()
+        merged = FloorStatistics()
+        for i in range(floor_count):
+            floor = DungeonFloor.from_seed(i, 1)
+            metrics = floor_metrics(floor)
+            self.assertEqual(metrics["room_count"] + metrics["rooms_dropped"], floor.rooms_requested)
+            statistics.add(metrics)
+
+        merged.merge(statistics)
+        self.assertEqual(merged.floor_count, floor_count)
+        self.assertLessEqual(merged.quantile("room_count", .5), DungeonFloor.MAX_ROOMS)
+        self.assertLessEqual(merged.quantile("corridor_tiles", 0), merged.quantile("corridor_tiles", 1))
+
+    # Chunks measured on the pool must merge into the same statistics as measuring every seed in order
+    def test_analyze_seeds(self, start: int = 10, stop: int = 70):
+        expected = FloorStatistics()
+        for seed in range(start, stop):
+            expected.add(floor_metrics(DungeonFloor.from_seed(seed, 2)))
+
+        statistics = analyze_seeds(start, stop, floor_number=2, processes=2, chunk_size=16)
+        self.assertEqual(statistics.floor_count, stop - start)
+        self.assertEqual(statistics.histograms, expected.histograms)
+        self.assertEqual(statistics.carve_algorithms, expected.carve_algorithms)
+
+        # Settings apply within the workers only
+        max_rooms = DungeonFloor.MAX_ROOMS
+        limited = analyze_seeds(start, stop, settings={"MIN_ROOMS": 3, "MAX_ROOMS": 4}, processes=2, chunk_size=16)
+        self.assertLessEqual(limited.quantile("room_count", 1), 4)
+        self.assertEqual(DungeonFloor.MAX_ROOMS, max_rooms)
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorCorpus import CorpusWriter, iter_corpus, read_manifest, read_record, verify_shard
+from lib.FloorSerializer import serialize_floor
+
+
+FAILING_SEED = 45
+
+
+# Defined at module level so it can be sent to workers under every start method
+def failing_generator(seed, floor_number: int, adaptive_placement: bool):
+    if seed == FAILING_SEED:
+        raise ValueError(f"Seed {seed} failed")
+    return DungeonFloor.from_seed(seed, floor_number, adaptive_placement)
+
+
+class TestFloorCorpus(unittest.TestCase):
+    def test_build_and_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            CorpusWriter(directory, shard_bytes=20000, batch_size=4, workers=2).build(0, 30)
+            first_shards = read_manifest(directory)["shards"]
+
+            # A second build resumes after the last completed shard instead of starting over
+            CorpusWriter(directory, shard_bytes=20000, batch_size=4, workers=2).build(0, 60)
+            shards = read_manifest(directory)["shards"]
+            self.assertEqual(shards[:len(first_shards)], first_shards)
+            self.assertGreater(len(shards), 1)
+
+            records = list(iter_corpus(directory))
+            self.assertEqual([seed for seed, _ in records], list(range(60)))
+            self.assertEqual(records[7][1], serialize_floor(DungeonFloor.from_seed(7, 1)))
+
+            for shard in shards:
+                self.assertTrue(verify_shard(directory, shard))
+                self.assertLessEqual(os.path.getsize(os.path.join(directory, shard["name"] + ".dat")), 20000)
+            self.assertEqual(read_record(directory, shards[1], 1)[0], shards[1]["start_seed"] + 1)
+
+    # A worker failure must stop the build, which later resumes after the last completed shard and replaces the
+    # partially written shard that was left behind
+    def test_interrupted_build(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(Exception) as context:
+                CorpusWriter(directory, shard_bytes=20000, batch_size=4, workers=2,
+                             floor_generator=failing_generator).build(0, 60)
+            self.assertIsInstance(context.exception.__cause__, ValueError)
+
+            shards = read_manifest(directory)["shards"]
+            self.assertGreater(len(shards), 0)
+            self.assertLessEqual(shards[-1]["stop_seed"], FAILING_SEED)
+
+            # Garbage is added to the leftover temporary shard, which must be overwritten rather than appended to
+            temporary_path = os.path.join(directory, f"shard_{len(shards):05d}.dat.tmp")
+            self.assertTrue(os.path.exists(temporary_path))
+            with open(temporary_path, "ab") as temporary_file:
+                temporary_file.write(b"garbage" * 1000)
+
+            CorpusWriter(directory, shard_bytes=20000, batch_size=4, workers=2).build(0, 60)
+            resumed_shards = read_manifest(directory)["shards"]
+            self.assertEqual(resumed_shards[:len(shards)], shards)
+            self.assertFalse(os.path.exists(temporary_path))
+
+            for shard in resumed_shards:
+                self.assertTrue(verify_shard(directory, shard))
+            records = list(iter_corpus(directory))
+            self.assertEqual([seed for seed, _ in records], list(range(60)))
+            self.assertEqual(records[FAILING_SEED][1], serialize_floor(DungeonFloor.from_seed(FAILING_SEED, 1)))
+
+    # A corpus must only be extended by the generator version which started it
+    def test_generator_version(self):
+        with tempfile.TemporaryDirectory() as directory:
+            CorpusWriter(directory, workers=1).build(0, 2)
+            self.assertEqual(read_manifest(directory)["generator_version"], DungeonFloor.GENERATOR_VERSION)
+
+            with mock.patch.object(DungeonFloor, "GENERATOR_VERSION", DungeonFloor.GENERATOR_VERSION + 1):
+                self.assertRaises(Exception, CorpusWriter, directory, workers=1)
@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorDelta import FloorDelta
+from lib.FloorSerializer import serialize_floor
+
+
+class TestFloorDelta(unittest.TestCase):
+    def make_changes(self, delta: FloorDelta):
+        x, y = next((x, y) for x, row in enumerate(delta.floor.floor_grid) for y, tile_id in enumerate(row) if tile_id)
+        delta.set_flag(x, y, "has_pitfall", True)
+        delta.remove_tile(x, y)
+        delta.add_tile(x, y, room_index=0)
+        delta.set_flag(x, y, "has_teleporter", True)
+
+        x, y = next((x, y) for x, row in enumerate(delta.floor.floor_grid) for y, tile_id in enumerate(row)
+                    if tile_id is None)
+        delta.add_tile(x, y)
+        delta.set_flag(x, y, "has_stairs", True)
+
+    def test_replay(self):
+        delta = FloorDelta(7, 2)
+        self.make_changes(delta)
+        loaded = FloorDelta.from_bytes(delta.to_bytes())
+        self.assertEqual(serialize_floor(loaded.floor), serialize_floor(delta.floor))
+
+    # Deltas must only be loaded by the generator version which recorded them
+    def test_generator_version(self):
+        data = FloorDelta(7, 2).to_bytes()
+        with mock.patch.object(DungeonFloor, "GENERATOR_VERSION", DungeonFloor.GENERATOR_VERSION + 1):
+            self.assertRaises(Exception, FloorDelta.from_bytes, data)
+
+    # Adding a tile to an occupied position is refused without changing the floor
+    def test_add_to_occupied_tile(self):
+        delta = FloorDelta(7, 2)
+        x, y = next(iter(delta.floor.rooms.values())).occupied_tiles[0]
+        expected = serialize_floor(delta.floor)
+        self.assertRaises(Exception, delta.add_tile, x, y, room_index=1)
+        self.assertEqual(serialize_floor(delta.floor), expected)
+        self.assertEqual(delta.operations, [])
+
+    def test_compaction(self):
+        delta = FloorDelta(7, 2)
+        self.make_changes(delta)
+        expected = serialize_floor(delta.floor)
+        operation_count = len(delta.operations)
+
+        delta.compact()
+        self.assertLess(len(delta.operations), operation_count)
+        self.assertEqual(serialize_floor(delta.load()), expected)
+
+    # Re-adding a room's first tile moves it to the end of the room, which compaction must keep
+    def test_compaction_keeps_tile_order(self):
+        delta = FloorDelta(7, 2)
+        room = next(iter(delta.floor.rooms.values()))
+        x, y = room.occupied_tiles[0]
+        delta.remove_tile(x, y)
+        delta.add_tile(x, y, room_index=0)
+        self.assertEqual(room.occupied_tiles[-1], [x, y])
+        expected = serialize_floor(delta.floor)
+
+        delta.compact()
+        self.assertEqual(serialize_floor(delta.load()), expected)
+        self.assertEqual(serialize_floor(FloorDelta.from_bytes(delta.to_bytes()).floor), expected)
+
+    # A minimal difference longer than the threshold must not be rebuilt on every later change
+    def test_compaction_frequency(self):
+        delta = FloorDelta(7, 2)
+        empty = [(x, y) for x, row in enumerate(delta.floor.floor_grid) for y, tile_id in enumerate(row)
+                 if tile_id is None]
+        with mock.patch.object(delta, "compact", wraps=delta.compact) as compact:
+            for x, y in empty[:FloorDelta.COMPACT_THRESHOLD + 50]:
+                delta.add_tile(x, y)
+            self.assertEqual(compact.call_count, 1)
+            self.assertEqual(delta.compacted_length, FloorDelta.COMPACT_THRESHOLD + 1)
+        self.assertEqual(serialize_floor(delta.load()), serialize_floor(delta.floor))
@@ -0,0 +1,25 @@
+import unittest
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorFingerprint import FingerprintIndex, fingerprint_rows, floor_fingerprint, symmetries
+from lib.FloorSerializer import deserialize_floor, serialize_floor, tile_kind_rows
+
+
+class TestFloorFingerprint(unittest.TestCase):
+    def test_ids_ignored(self):
+        floor = DungeonFloor(1)
+        self.assertEqual(floor_fingerprint(floor), floor_fingerprint(deserialize_floor(serialize_floor(floor))))
+
+    def test_symmetry_invariance(self):
+        rows = tile_kind_rows(DungeonFloor(1))
+        fingerprints = {fingerprint_rows(grid) for grid in symmetries(rows)}
+        invariant_fingerprints = {fingerprint_rows(grid, invariant=True) for grid in symmetries(rows)}
+        self.assertGreater(len(fingerprints), 1)
+        self.assertEqual(len(invariant_fingerprints), 1)
+
+    def test_index(self):
+        index = FingerprintIndex()
+        fingerprint, is_new = index.add(1, DungeonFloor.from_seed(1, 1))
+        self.assertTrue(is_new)
+        self.assertFalse(index.add(2, DungeonFloor.from_seed(1, 1))[1])
+        self.assertEqual(index.lookup(fingerprint), [1, 2])
+        self.assertEqual(index.duplicate_count(), 1)
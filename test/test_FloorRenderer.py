@@ -0,0 +1,25 @@
+import unittest
+import zlib
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorRenderer import render_ascii, render_contact_sheet
+
+
+class TestFloorRenderer(unittest.TestCase):
+    def test_ascii(self):
+        floor = DungeonFloor(1)
+        lines = render_ascii(floor).split("\n")
+        self.assertEqual(len(lines), 32)
+        self.assertEqual(sum(line.count("X") + line.count("O") for line in lines), len(floor.tiles))
+
+    def test_contact_sheet(self):
+        image = render_contact_sheet([DungeonFloor(i) for i in range(5)], columns=2, scale=2, padding=1)
+        self.assertEqual(image[:8], b"\x89PNG\r\n\x1a\n")
+
+        # Three rows of two floors, each 64 pixels plus padding
+        width = int.from_bytes(image[16:20], "big")
+        height = int.from_bytes(image[20:24], "big")
+        self.assertEqual((width, height), (2 * 65 + 1, 3 * 65 + 1))
+
+        idat_length = int.from_bytes(image[image.index(b"IDAT") - 4:image.index(b"IDAT")], "big")
+        idat_start = image.index(b"IDAT") + 4
+        self.assertEqual(len(zlib.decompress(image[idat_start:idat_start + idat_length])), height * (width + 1))
@@ -0,0 +1,13 @@
+import unittest
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorSerializer import deserialize_floor, serialize_floor
+
+
+class TestFloorSerializer(unittest.TestCase):
+    def test_seeded_generation(self):
+        self.assertEqual(serialize_floor(DungeonFloor.from_seed(42, 3)), serialize_floor(DungeonFloor.from_seed(42, 3)))
+
+    def test_round_trip(self, floor_count: int = 100):
+        for i in range(floor_count):
+            data = serialize_floor(DungeonFloor(i))
+            self.assertEqual(serialize_floor(deserialize_floor(data)), data)
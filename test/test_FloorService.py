@@ -0,0 +1,103 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from lib.DungeonFloor import DungeonFloor
+from lib.FloorSerializer import serialize_floor
+from lib.FloorService import FloorCache, FloorService
+
+
+class TestFloorCache(unittest.TestCase):
+    # The least recently used entries are evicted once the cached data exceeds the byte budget
+    def test_eviction(self):
+        cache = FloorCache(10)
+        cache.put("a", b"1234")
+        cache.put("b", b"1234")
+        self.assertEqual(cache.get("a"), b"1234")
+        cache.put("c", b"1234")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.size, 8)
+
+        # Replacing an entry updates the size, and entries larger than the budget are never stored
+        cache.put("a", b"123456")
+        self.assertEqual(list(cache.entries), ["c", "a"])
+        self.assertEqual(cache.size, 10)
+        cache.put("d", b"12345678901")
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(cache.size, 10)
+
+
+class TestFloorService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = FloorService(max_workers=1)
+        await self.service.start()
+
+    async def asyncTearDown(self):
+        await self.service.stop()
+
+    # Concurrent requests for the same floor share a single generation, and the result is cached afterwards
+    async def test_coalescing(self, request_count: int = 10):
+        with mock.patch.object(self.service, "_generate", wraps=self.service._generate) as generate:
+            results = await asyncio.gather(*(self.service.generate_floor_bytes(seed, 2)
+                                             for seed in [7, "7"] * (request_count // 2)))
+            self.assertEqual(generate.call_count, 1)
+            self.assertTrue(all(result is results[0] for result in results))
+            self.assertEqual(results[0], serialize_floor(DungeonFloor.from_seed(7, 2)))
+            self.assertEqual(self.service.pending, {})
+
+            self.assertIs(await self.service.generate_floor_bytes(7, 2), results[0])
+            self.assertEqual(generate.call_count, 1)
+
+    # A cancelled request must not stop later requests for the same floor from sharing its generation
+    async def test_cancelled_request(self):
+        with mock.patch.object(self.service, "_generate", wraps=self.service._generate) as generate:
+            first = asyncio.ensure_future(self.service.generate_floor_bytes(11, 1))
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            self.assertIn(("11", 1), self.service.pending)
+
+            data = await self.service.generate_floor_bytes(11, 1)
+            self.assertEqual(generate.call_count, 1)
+            self.assertEqual(data, serialize_floor(DungeonFloor.from_seed(11, 1)))
+            await asyncio.sleep(0)
+            self.assertEqual(self.service.pending, {})
+
+    async def request(self, port: int, path: str):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+
+        head, body = response.split(b"\r\n\r\n", 1)
+        status_line, *headers = head.decode("latin-1").split("\r\n")
+        self.assertIn(f"Content-Length: {len(body)}", headers)
+        return int(status_line.split()[1]), body
+
+    async def test_http_handler(self):
+        server = await asyncio.start_server(self.service.handle_http, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            status, body = await self.request(port, "/floor?seed=abc&floor=3")
+            self.assertEqual(status, 200)
+            self.assertEqual(body, serialize_floor(DungeonFloor.from_seed("abc", 3)))
+            self.assertEqual(json.loads(body)["floor_number"], 3)
+
+            for path, expected_status in [("/floor?floor=3", 400), ("/floor?seed=abc&floor=x", 400), ("/", 404)]:
+                status, body = await self.request(port, path)
+                self.assertEqual(status, expected_status)
+                self.assertIn("error", json.loads(body))
+
+    # Failures during generation are the server's fault, and must still produce a response
+    async def test_http_generation_error(self):
+        server = await asyncio.start_server(self.service.handle_http, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            for error in (ValueError("Invalid layout"), RuntimeError("Process pool is broken")):
+                with mock.patch.object(self.service, "generate_floor_bytes", side_effect=error):
+                    status, body = await self.request(port, "/floor?seed=abc&floor=3")
+                self.assertEqual(status, 500)
+                self.assertIn("error", json.loads(body))
@@ -0,0 +1,58 @@
+import importlib.util
+import struct
+import unittest
+import zlib
+
+from lib.DungeonExporter import iter_dungeon_lua
+from lib.DungeonFloor import DungeonFloor
+
+# Header, mod info header and directory entry layouts of a .dat file
+HEADER_SIZE = 8
+MOD_INFO_FORMAT = "<IIIII"
+DIRECTORY_ENTRY_FORMAT = "<IIIII"
+
+
+@unittest.skipUnless(importlib.util.find_spec("fnvhash"), "fnvhash is not installed")
+class TestPackageMod(unittest.TestCase):
+    def read_directory(self, data: bytes) -> list:
+        self.assertEqual(data[:HEADER_SIZE], b"GRA2" + (11).to_bytes(4, "little"))
+        _, info_start, _, info_size, _ = struct.unpack_from(MOD_INFO_FORMAT, data, HEADER_SIZE)
+        entry_count = (info_start - 28) // struct.calcsize(DIRECTORY_ENTRY_FORMAT)
+
+        entries = [struct.unpack_from(DIRECTORY_ENTRY_FORMAT, data, 28 + i * struct.calcsize(DIRECTORY_ENTRY_FORMAT))
+                   for i in range(entry_count)]
+
+        # Compressed files follow the dungeon info, in directory order
+        data_start = info_start + info_size
+        for _, offset, compressed_size, _, _ in entries:
+            self.assertEqual(offset, data_start)
+            data_start += compressed_size
+        self.assertEqual(data_start, len(data))
+        return entries
+
+    # Every entry, including a chunked one, must decompress to its input and record its uncompressed size
+    def test_virtual_dat_file(self, floor_count: int = 5):
+        import fnvhash
+        from packageMod import DungeonInfo, package_virtual_dat_file
+
+        floors = [DungeonFloor.from_seed(seed, 1) for seed in range(floor_count)]
+        dungeon_lua = "".join(iter_dungeon_lua(floors)).encode("utf-8")
+        contents = {
+            "mod_assets/scripts/init.lua": "import \"assets/scripts/standard_assets.lua\"\n",
+            "mod_assets/textures/blank.bin": bytes(range(256)) * 4,
+            "mod_assets/scripts/dungeon.lua": iter_dungeon_lua(floors, buffer_size=1024),
+        }
+        info = DungeonInfo("Test Dungeon", "Author", "Description", "mod_assets/scripts")
+        data = package_virtual_dat_file(info, contents)
+
+        expected = {
+            fnvhash.fnv1a_32(b"mod_assets/scripts/init.lua"): contents["mod_assets/scripts/init.lua"].encode("utf-8"),
+            fnvhash.fnv1a_32(b"mod_assets/textures/blank.bin"): contents["mod_assets/textures/blank.bin"],
+            fnvhash.fnv1a_32(b"mod_assets/scripts/dungeon.lua"): dungeon_lua,
+        }
+        entries = self.read_directory(data)
+        self.assertEqual(len(entries), len(expected))
+        for name_hash, offset, compressed_size, uncompressed_size, _ in entries:
+            file_data = zlib.decompress(data[offset:offset + compressed_size])
+            self.assertEqual(file_data, expected[name_hash])
+            self.assertEqual(uncompressed_size, len(file_data))